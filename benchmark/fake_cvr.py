@@ -0,0 +1,92 @@
+"""This module contains a local stand-in for the CVR webservice."""
+
+import json
+import threading
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from itk_dev_shared_components.misc.cvr_lookup import Company
+
+COMPANY_TYPES = ["Enkeltmandsvirksomhed", "Anpartsselskab", "Aktieselskab", "Interessentskab"]
+
+
+class FakeCvrServer(ThreadingHTTPServer):
+    """A http server answering CVR searches like distribution.virk.dk with a configurable latency."""
+
+    def __init__(self, port: int = 0, latency: float = 0.05):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.request_count = 0
+        self.count_lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The url of the search endpoint."""
+        return f"http://127.0.0.1:{self.server_port}/cvr-permanent/virksomhed/_search"
+
+    def start(self) -> "FakeCvrServer":
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+# pylint: disable-next=too-few-public-methods
+class FakeCvrLookup:
+    """A drop-in for itk_dev_shared_components.misc.cvr_lookup that calls the fake server."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def cvr_lookup(self, cvr: str, username: str, password: str) -> Company:
+        """Look up a company like cvr_lookup.cvr_lookup but on the fake server."""
+        data = {"query": {"term": {"Vrvirksomhed.cvrNummer": cvr}}}
+        response = requests.post(self.url, auth=(username, password), json=data, timeout=5)
+        response.raise_for_status()
+        metadata = response.json()['hits']['hits'][0]['_source']['Vrvirksomhed']['virksomhedMetadata']
+        return Company(cvr=cvr, name=metadata['nyesteNavn']['navn'], founded_date=date.fromisoformat(metadata['stiftelsesDato']),
+                       address="", postal_code="", city="", company_type=metadata['nyesteVirksomhedsform']['langBeskrivelse'])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeCvrServer
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Answer a search for a single cvr number."""
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        cvr = str(body['query']['term']['Vrvirksomhed.cvrNummer'])
+
+        time.sleep(self.server.latency)
+        with self.server.count_lock:
+            self.server.request_count += 1
+
+        company = {
+            "cvrNummer": int(cvr),
+            "virksomhedMetadata": {
+                "nyesteNavn": {"navn": f"Virksomhed {cvr}"},
+                "stiftelsesDato": "2010-01-01",
+                "nyesteVirksomhedsform": {"langBeskrivelse": COMPANY_TYPES[int(cvr) % len(COMPANY_TYPES)]},
+                "nyesteBeliggenhedsadresse": {
+                    "conavn": None, "vejnavn": "Testvej", "husnummerFra": 1, "husnummerTil": None,
+                    "bogstavFra": None, "bogstavTil": None, "etage": None, "sidedoer": None,
+                    "postnummer": 8000, "postdistrikt": "Aarhus C"
+                }
+            }
+        }
+        response = json.dumps({"hits": {"total": 1, "hits": [{"_source": {"Vrvirksomhed": company}}]}}).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the benchmark output clean."""
@@ -0,0 +1,215 @@
+"""This module contains a local stand-in for the KSDP web app.
+It mimics the element ids and loading behaviour ksd_process relies on,
+with a configurable latency on every server call and page load.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from robot_framework.sub_process.ksd_http import FIELD_KEYS
+
+START_PAGE = """<html><body>
+<form action="/login">
+    <select id="SelectedAuthenticationUrl"><option>Vælg kommune</option><option>Aarhus Kommune</option></select>
+    <input type="submit" value="OK">
+</form>
+</body></html>"""
+
+LOGIN_PAGE = """<html><body>
+<input name="loginfmt">
+<input name="passwd" type="password" style="display:none">
+<button id="idSIButton9">Næste</button>
+<script>
+let step = 0;
+document.getElementById('idSIButton9').onclick = () => {
+    if (step === 0) {
+        document.getElementsByName('loginfmt')[0].style.display = 'none';
+        document.getElementsByName('passwd')[0].style.display = '';
+        step = 1;
+    } else {
+        location.href = '/main';
+    }
+};
+</script>
+</body></html>"""
+
+MAIN_PAGE = """<html><body>
+<img src="/static/logo.png" alt="">
+<div>
+    <button id="MainShell-logout">Log ud</button>
+    <span title="Funktioner" onclick="show('functions')">Funktioner</span>
+    <div id="functions" style="display:none"><button title="Rapporter" onclick="show('reports')">Rapporter</button></div>
+    <div id="reports" style="display:none"><span title="R34 Liste over nyoprettede sager" onclick="openReport()">R34</span></div>
+</div>
+<div id="tabs">
+    <div class="tab">
+        <span class="kmdtabclose">x</span>
+        <input id="__jsview0--TFSearchResultCaseNo">
+        <button id="__button0" onclick="search()">Søg</button>
+        <table><tr><td id="__table0-rows-row0-col0" onclick="openCase()">Åbn</td><td id="__table0-rows-row0-col6"></td></tr></table>
+    </div>
+</div>
+<script>
+const LATENCY = __LATENCY__;
+const KEYS = __KEYS__;
+let tabCount = 0;
+
+function show(id) { document.getElementById(id).style.display = ''; }
+
+function busy(callback) {
+    document.body.setAttribute('aria-busy', 'true');
+    setTimeout(() => { callback(); document.body.removeAttribute('aria-busy'); }, LATENCY);
+}
+
+function addElement(parent, tag, id, value) {
+    const element = document.createElement(tag);
+    element.id = id;
+    if (value !== undefined) element.value = value;
+    parent.appendChild(element);
+    return element;
+}
+
+function addTab() {
+    const tab = document.createElement('div');
+    tab.className = 'tab';
+    const close = document.createElement('span');
+    close.className = 'kmdtabclose';
+    close.textContent = 'x';
+    close.onclick = () => tab.remove();
+    tab.appendChild(close);
+    document.getElementById('tabs').appendChild(tab);
+    return tab;
+}
+
+function search() {
+    const caseNumber = document.getElementById('__jsview0--TFSearchResultCaseNo').value;
+    busy(() => { document.getElementById('__table0-rows-row0-col6').textContent = caseNumber; });
+}
+
+function openCase() {
+    const caseNumber = document.getElementById('__table0-rows-row0-col6').textContent;
+    document.body.setAttribute('aria-busy', 'true');
+    fetch('/api/sag/' + caseNumber).then(response => response.json()).then(data => busy(() => {
+        const prefix = 'case' + (++tabCount);
+        const tab = addTab();
+        addElement(tab, 'img', prefix + '--photo').src = '/static/photo.png?case=' + caseNumber;
+        addElement(tab, 'input', prefix + '--TelefonnummerTF', data[KEYS.phone_number]);
+        const navbar = addElement(tab, 'a', prefix + '--navbar-2');
+        navbar.textContent = 'Side 2';
+        navbar.onclick = () => busy(() => {
+            addElement(tab, 'input', prefix + '--DDBFravaersAarsag-input', data[KEYS.absence_reason]);
+            addElement(tab, 'textarea', prefix + '--TFFravaersAarsagBem', data[KEYS.absence_reason_note]);
+            addElement(tab, 'input', prefix + '--DPDelvisUarbejdsdygtigStartdato-col0-row0-input', data[KEYS.partial_incapacity_date]);
+            addElement(tab, 'input', prefix + '--DPDelvisUarbejdsdygtigAndel-col1-row0-input', data[KEYS.partial_incapacity_status]);
+        });
+    }));
+}
+
+function openReport() {
+    busy(() => {
+        const tab = addTab();
+        addElement(tab, 'span', 'r34--weekCB').textContent = 'Uge';
+        addElement(tab, 'input', 'r34--fromDP-inner');
+        addElement(tab, 'input', 'r34--toDP-inner');
+        const button = addElement(tab, 'button', 'r34--oReportsHENTCSVSOM');
+        button.textContent = 'Hent CSV';
+        button.onclick = () => { location.href = '/report.csv'; };
+    });
+}
+</script>
+</body></html>"""
+
+ABSENCE_REASONS = ["Sygdom", "Arbejdsskade", "Graviditet", ""]
+
+# Served for every image to give the browser profiles something to load or block
+IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(200_000)
+
+
+class FakeKsdpServer(ThreadingHTTPServer):
+    """A http server imitating the parts of KSDP used by the robot."""
+
+    def __init__(self, port: int = 0, latency: float = 0.2):
+        """
+        Args:
+            port: The port to listen on. 0 picks a free port.
+            latency: The delay in seconds of every page load and data request.
+        """
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.latency = latency
+        self.report_path: str | None = None
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The base url of the server."""
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self) -> "FakeKsdpServer":
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+def case_data(case_number: str) -> dict[str, str]:
+    """Create deterministic case details for a case number, keyed like the KSDP data endpoint."""
+    digest = int(hashlib.md5(case_number.encode()).hexdigest(), 16)
+    has_partial = digest % 5 == 0
+    return {
+        FIELD_KEYS['phone_number']: f"{20_000_000 + digest % 80_000_000}",
+        FIELD_KEYS['absence_reason']: ABSENCE_REASONS[digest % len(ABSENCE_REASONS)],
+        FIELD_KEYS['absence_reason_note']: f"Bemærkning til sag {case_number}" if digest % 3 == 0 else "",
+        FIELD_KEYS['partial_incapacity_date']: f"{1 + digest % 28:02}012024" if has_partial else "",
+        FIELD_KEYS['partial_incapacity_status']: "50" if has_partial else ""
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: FakeKsdpServer
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve the pages, the case data and the report."""
+        path = urlparse(self.path).path
+
+        if path == "/start":
+            self._send(START_PAGE.encode(), "text/html; charset=utf-8")
+        elif path == "/login":
+            self._send(LOGIN_PAGE.encode(), "text/html; charset=utf-8")
+        elif path == "/main":
+            page = MAIN_PAGE.replace("__LATENCY__", str(int(self.server.latency * 1000)))
+            page = page.replace("__KEYS__", json.dumps(FIELD_KEYS))
+            self._send(page.encode(), "text/html; charset=utf-8")
+        elif path.startswith("/api/sag/"):
+            time.sleep(self.server.latency)
+            case_number = path.rsplit("/", 1)[-1]
+            self._send(json.dumps(case_data(case_number)).encode(), "application/json")
+        elif path.startswith("/static/"):
+            time.sleep(self.server.latency)
+            self._send(IMAGE, "image/png")
+        elif path == "/report.csv" and self.server.report_path and os.path.isfile(self.server.report_path):
+            time.sleep(self.server.latency)
+            with open(self.server.report_path, "rb") as file:
+                self._send(file.read(), "text/csv", {"Content-Disposition": "attachment; filename=rapport34.csv"})
+        else:
+            self.send_error(404)
+
+    def _send(self, body: bytes, content_type: str, headers: dict[str, str] | None = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keep the benchmark output clean."""
@@ -0,0 +1,78 @@
+"""This module contains a local stand-in for the SMTP server.
+It speaks just enough SMTP for smtplib and keeps the received messages in memory.
+"""
+
+import socketserver
+import threading
+
+
+class FakeSmtpServer(socketserver.ThreadingTCPServer):
+    """An SMTP server without TLS or authentication that stores every message it receives."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.messages: list[bytes] = []
+        self.connection_count = 0
+        self.lock = threading.Lock()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def port(self) -> int:
+        """The port the server listens on."""
+        return self.server_address[1]
+
+    def start(self) -> "FakeSmtpServer":
+        """Start serving in a background thread."""
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop the server."""
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: FakeSmtpServer
+
+    def handle(self):
+        """Handle a single SMTP session."""
+        with self.server.lock:
+            self.server.connection_count += 1
+
+        self._reply("220 localhost fake smtp")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line.decode("ascii", errors="replace").strip().upper()
+            if command.startswith("EHLO"):
+                self._reply("250-localhost\r\n250 SIZE 100000000")
+            elif command.startswith("DATA"):
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                self._read_data()
+                self._reply("250 OK")
+            elif command.startswith("QUIT"):
+                self._reply("221 Bye")
+                return
+            else:
+                # HELO, MAIL, RCPT, RSET and NOOP are all just accepted
+                self._reply("250 OK")
+
+    def _read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line == b".\r\n":
+                break
+            lines.append(line)
+
+        with self.server.lock:
+            self.server.messages.append(b"".join(lines))
+
+    def _reply(self, message: str):
+        self.wfile.write(message.encode("ascii") + b"\r\n")
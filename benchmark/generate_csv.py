@@ -0,0 +1,64 @@
+"""This module generates synthetic rapport 34 csv files for benchmarking."""
+
+import csv
+import random
+from datetime import date, timedelta
+
+HEADER = [
+    "Opret-dato",
+    "Sagsnummer",
+    "CPR-nummer",
+    "Borger",
+    "CVR-nummer",
+    "Virksomhed",
+    "Sygemeldt-Type",
+    "Sagsstatus",
+    "Første fraværsdag",
+    "Sidste fraværsdag",
+    "Delvis genoptaget arbejde"
+]
+
+ABSENTEE_TYPES = ["Selvstændig", "Lønmodtager", "Ledig", "Fleksjobber"]
+CASE_STATUSES = ["Aktiv", "Under oprettelse", "Afsluttet", "Lukket"]
+
+
+def generate_report(file_path: str, row_count: int, company_count: int | None = None, seed: int = 34) -> None:
+    """Write a synthetic rapport 34 csv file.
+    Most rows are relevant cases, so the filter in the robot keeps the bulk of them.
+    CVR numbers are drawn from a limited pool so companies repeat like in real reports.
+
+    Args:
+        file_path: The path to write the csv file to.
+        row_count: The number of rows in the report.
+        company_count: The number of unique companies. Defaults to a third of the rows.
+        seed: The seed of the random generator, so reports are reproducible.
+    """
+    rand = random.Random(seed)
+    company_count = company_count or max(1, row_count // 3)
+    companies = [(f"{rand.randrange(10_000_000, 99_999_999)}", f"Virksomhed {i} ApS") for i in range(company_count)]
+    start_date = date.today() - timedelta(weeks=1)
+
+    with open(file_path, "w", encoding="UTF-8-sig", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(HEADER)
+
+        for i in range(row_count):
+            cvr, company_name = rand.choice(companies)
+            creation_date = start_date + timedelta(days=rand.randrange(7))
+            first_absence = creation_date - timedelta(days=rand.randrange(30))
+            last_absence = first_absence + timedelta(days=rand.randrange(60)) if rand.random() < 0.3 else None
+            resumption = first_absence + timedelta(days=rand.randrange(30)) if rand.random() < 0.2 else None
+
+            writer.writerow([
+                creation_date.isoformat(),
+                f"{100_000 + i}",
+                f"{rand.randrange(1, 28):02}{rand.randrange(1, 12):02}{rand.randrange(40, 99)}{rand.randrange(1000, 9999)}",
+                f"Borger {i}",
+                cvr,
+                company_name,
+                rand.choices(ABSENTEE_TYPES, weights=[85, 5, 5, 5])[0],
+                rand.choices(CASE_STATUSES, weights=[80, 10, 5, 5])[0],
+                first_absence.isoformat(),
+                last_absence.isoformat() if last_absence else "",
+                resumption.isoformat() if resumption else ""
+            ])
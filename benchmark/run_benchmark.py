@@ -0,0 +1,199 @@
+"""Run process.process end to end against local stand-ins for KSDP, CVR and SMTP
+and report throughput, per phase timings and memory for a range of report sizes.
+
+Usage:
+    python -m benchmark.run_benchmark --sizes 10 100 1000 --latency 0.2 --backend browser --profile lean
+
+The CPU time used by Chrome is only reported if psutil is installed.
+"""
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+try:
+    import psutil
+except ImportError:
+    psutil = None  # pylint: disable=invalid-name
+
+from robot_framework import config, metrics, process
+from robot_framework.sub_process import ksd_session, cvr_process
+from benchmark.fake_ksdp import FakeKsdpServer
+from benchmark.fake_cvr import FakeCvrServer, FakeCvrLookup
+from benchmark.fake_smtp import FakeSmtpServer
+from benchmark.generate_csv import generate_report
+
+DEFAULT_SIZES = [10, 100, 1000, 10_000, 50_000]
+
+
+@dataclass
+class FakeOrchestratorConnection:
+    """A stand-in for OrchestratorConnection that keeps the log in memory."""
+    process_arguments: str = "benchmark@localhost"
+    process_name: str = "Rapport 34 benchmark"
+    log: list[tuple[str, str]] = field(default_factory=list)
+
+    def log_trace(self, message: str) -> None:
+        """Store a trace log."""
+        self.log.append(("trace", message))
+
+    def log_info(self, message: str) -> None:
+        """Store an info log."""
+        self.log.append(("info", message))
+
+    def log_error(self, message: str) -> None:
+        """Store an error log."""
+        self.log.append(("error", message))
+
+    def get_credential(self, credential_name: str) -> SimpleNamespace:
+        """Return dummy credentials."""
+        return SimpleNamespace(name=credential_name, username="benchmark", password="benchmark")
+
+    def get_constant(self, constant_name: str) -> SimpleNamespace:
+        """Return a dummy constant."""
+        return SimpleNamespace(name=constant_name, value="benchmark@localhost")
+
+
+@contextmanager
+def _patch(obj, attribute: str, value):
+    """Temporarily replace an attribute on an object or module."""
+    original = getattr(obj, attribute)
+    setattr(obj, attribute, value)
+    try:
+        yield
+    finally:
+        setattr(obj, attribute, original)
+
+
+def run(size: int, ksdp: FakeKsdpServer, cvr: FakeCvrServer, smtp: FakeSmtpServer, *, backend: str, queue_size: int, cvr_concurrency: int, profile: str) -> dict:
+    """Run the process once on a synthetic report of the given size.
+
+    Args:
+        size: The number of rows in the report.
+        ksdp: The running fake KSDP server.
+        cvr: The running fake CVR server.
+        smtp: The running fake SMTP server.
+        backend: The KSDP backend to use, see config.KSDP_BACKEND.
+        queue_size: The max number of cases waiting between the pipeline stages, see config.PIPELINE_QUEUE_SIZE.
+        cvr_concurrency: The number of concurrent CVR lookups, see config.CVR_MAX_CONCURRENT.
+        profile: The browser profile to use, see config.KSDP_BROWSER_PROFILE.
+
+    Returns:
+        A dict describing the result of the run.
+    """
+    work_folder = tempfile.mkdtemp(prefix="r34_benchmark_")
+    report_path = f"{work_folder}/report.csv"
+    generate_report(report_path, size)
+    ksdp.report_path = report_path
+
+    with ExitStack() as stack:
+        stack.enter_context(_patch(config, "KSDP_URL", ksdp.url))
+        stack.enter_context(_patch(config, "KSDP_BACKEND", backend))
+        stack.enter_context(_patch(config, "PIPELINE_QUEUE_SIZE", queue_size))
+        stack.enter_context(_patch(config, "CVR_MAX_CONCURRENT", cvr_concurrency))
+        stack.enter_context(_patch(config, "KSDP_BROWSER_PROFILE", profile))
+        stack.enter_context(_patch(config, "CACHE_FOLDER", work_folder))
+        stack.enter_context(_patch(config, "BACKFILL_FOLDER", f"{work_folder}/backfill"))
+        stack.enter_context(_patch(config, "CHECKPOINT_FOLDER", f"{work_folder}/checkpoint"))
+        stack.enter_context(_patch(cvr_process, "cvr_lookup", FakeCvrLookup(cvr.url)))
+        stack.enter_context(_patch(config, "SMTP_SERVER", "127.0.0.1"))
+        stack.enter_context(_patch(config, "SMTP_PORT", smtp.port))
+        stack.enter_context(_patch(config, "SMTP_REQUIRE_TLS", False))
+
+        connection = FakeOrchestratorConnection()
+        cvr.request_count = 0
+        smtp.messages.clear()
+        metrics.reset()
+
+        tracemalloc.start()
+        cpu_before = _get_browser_cpu_seconds()
+        start = time.perf_counter()
+        process.process(connection)
+        total = time.perf_counter() - start
+        cpu_after = _get_browser_cpu_seconds()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    shutil.rmtree(work_folder, ignore_errors=True)
+
+    summary = metrics.get_summary()
+    case_count = next((int(m.split()[2]) for level, m in connection.log if level == "info" and m.startswith("Searching info on")), 0)
+    return {
+        "rows": size,
+        "cases": case_count,
+        "total_seconds": round(total, 3),
+        "cases_per_minute": round(case_count / total * 60, 1) if total else 0,
+        "phases": {name: timing['total'] for name, timing in summary['timings'].items()},
+        "per_case": summary['timings'].get("get_case_info"),
+        "browser_cpu_seconds": round(cpu_after - cpu_before, 2) if psutil else None,
+        "browser_cpu_ms_per_case": round((cpu_after - cpu_before) / case_count * 1000, 1) if psutil and case_count else None,
+        "counters": summary['counters'],
+        "cvr_requests": cvr.request_count,
+        "peak_python_memory_mb": round(peak_memory / 1024 / 1024, 1),
+        "emails_sent": len(smtp.messages),
+        "email_bytes": sum(len(m) for m in smtp.messages)
+    }
+
+
+def _get_browser_cpu_seconds() -> float:
+    """Get the total CPU time used by the processes of all open KSDP browsers, or 0 without psutil."""
+    if psutil is None:
+        return 0.0
+
+    total = 0.0
+    for browser in ksd_session.get_browsers():
+        try:
+            driver = psutil.Process(browser.service.process.pid)
+            for proc in [driver] + driver.children(recursive=True):
+                cpu_times = proc.cpu_times()
+                total += cpu_times.user + cpu_times.system
+        except (AttributeError, psutil.Error):
+            continue
+    return total
+
+
+def main():
+    """Parse the command line arguments and run the benchmark for each report size."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="The report sizes in rows.")
+    parser.add_argument("--latency", type=float, default=0.2, help="The latency of the fake KSDP in seconds.")
+    parser.add_argument("--cvr-latency", type=float, default=0.05, help="The latency of the fake CVR service in seconds.")
+    parser.add_argument("--backend", choices=["browser", "http"], default=config.KSDP_BACKEND, help="The KSDP backend to use.")
+    parser.add_argument("--queue-size", type=int, default=config.PIPELINE_QUEUE_SIZE, help="The max number of cases waiting between the pipeline stages.")
+    parser.add_argument("--cvr-concurrency", type=int, default=config.CVR_MAX_CONCURRENT, help="The number of concurrent CVR lookups.")
+    parser.add_argument("--profile", choices=["default", "lean"], default=config.KSDP_BROWSER_PROFILE, help="The browser profile to use.")
+    parser.add_argument("--output", help="A path to write the results to as json.")
+    args = parser.parse_args()
+
+    ksdp = FakeKsdpServer(latency=args.latency).start()
+    cvr = FakeCvrServer(latency=args.cvr_latency).start()
+    smtp = FakeSmtpServer().start()
+
+    results = []
+    try:
+        for size in args.sizes:
+            result = run(size, ksdp, cvr, smtp, backend=args.backend, queue_size=args.queue_size,
+                         cvr_concurrency=args.cvr_concurrency, profile=args.profile)
+            results.append(result)
+            print(f"{result['rows']:>6} rows  {result['cases']:>6} cases  {result['total_seconds']:>9.1f} s  "
+                  f"{result['cases_per_minute']:>9.1f} cases/min  {result['peak_python_memory_mb']:>7.1f} MB  "
+                  f"{result['browser_cpu_ms_per_case']} ms browser CPU/case  {result['phases']}")
+    finally:
+        ksd_session.close_all()
+        ksdp.stop()
+        cvr.stop()
+        smtp.stop()
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
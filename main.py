@@ -1,17 +1,78 @@
 """The main file of the robot which will install all requirements in
 a virtual environment and then start the actual process.
+The virtual environment is keyed on a hash of pyproject.toml and the Python version,
+so it's only rebuilt when the requirements have changed.
 """
 
-import subprocess
+import glob
+import hashlib
 import os
+import shutil
+import subprocess
 import sys
+import time
+
+# The name of the environment variable holding the time the robot was started.
+# Read by robot_framework.linear_framework to report the time to first action.
+START_TIME_VARIABLE = "ROBOT_START_TIME"
+
+os.environ[START_TIME_VARIABLE] = str(time.time())
 
 script_directory = os.path.dirname(os.path.realpath(__file__))
 os.chdir(script_directory)
 
-subprocess.run("python -m venv .venv", check=True)
-subprocess.run(r'.venv\Scripts\pip install .', check=True)
 
-command_args = [r".venv\Scripts\python", "-m", "robot_framework"] + sys.argv[1:]
+def get_venv_path() -> str:
+    """Get the path of the virtual environment matching the current requirements."""
+    with open("pyproject.toml", "rb") as file:
+        digest = hashlib.sha256(file.read())
+    digest.update(sys.version.encode())
+    return f".venv-{digest.hexdigest()[:12]}"
+
+
+def build_venv(venv_path: str) -> None:
+    """Build the virtual environment in a temporary folder and move it in place when it's complete,
+    so a failed or interrupted build is never used.
+    The temporary folder is named after the process, so robots building at the same time don't touch each other's builds.
+    """
+    temp_path = f"{venv_path}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+    subprocess.run([sys.executable, "-m", "venv", temp_path], check=True)
+    subprocess.run([os.path.join(temp_path, "Scripts", "python"), "-m", "pip", "install", "."], check=True)
+
+    try:
+        os.rename(temp_path, venv_path)
+    except OSError:
+        # Another robot finished the same build first
+        if not os.path.isdir(venv_path):
+            raise
+        shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def remove_old_venvs(venv_path: str) -> None:
+    """Remove virtual environments from earlier versions of the requirements.
+    Environments still in use by another robot are skipped.
+    """
+    for path in glob.glob(".venv-*"):
+        if path == venv_path or path.endswith(".tmp"):
+            continue
+
+        # Windows refuses to rename a folder with files in use, so this fails if another robot is running from it
+        old_path = path if path.endswith(".old") else f"{path}.old"
+        try:
+            os.rename(path, old_path)
+        except OSError:
+            continue
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+VENV_PATH = get_venv_path()
+if not os.path.isdir(VENV_PATH):
+    build_venv(VENV_PATH)
+    remove_old_venvs(VENV_PATH)
+
+# The robot runs from the source folder, so only changes to the requirements need a rebuild
+command_args = [os.path.join(VENV_PATH, "Scripts", "python"), "-m", "robot_framework"] + sys.argv[1:]
 
 subprocess.run(command_args, check=True)
@@ -1,15 +1,124 @@
 """This module contains configuration constants used across the framework"""
 
+import os
+from datetime import timedelta
+
 # The number of times the robot retries on an error before terminating.
 MAX_RETRY_COUNT = 3
 
 # Whether the robot should be marked as failed if MAX_RETRY_COUNT is reached.
 FAIL_ROBOT_ON_TOO_MANY_ERRORS = True
 
-# Error screenshot config
+# KSDP config
+KSDP_URL = "https://ksdp.dk"
+
+# The Chrome profile used for KSDP. "default" is a normal visible browser.
+# "lean" blocks images and other unneeded resources, skips waiting for subresources
+# on page loads and runs headless if KSDP_LEAN_HEADLESS is set.
+KSDP_BROWSER_PROFILE = "default"
+KSDP_LEAN_HEADLESS = True
+KSDP_LEAN_BROWSER_ARGUMENTS = [
+    "--window-size=1920,1080",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--disable-default-apps",
+    "--disable-features=Translate,OptimizationHints,MediaRouter",
+    "--no-first-run",
+    "--mute-audio",
+    "--blink-settings=imagesEnabled=false"
+]
+KSDP_LEAN_BLOCKED_URLS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.mp4", "*.webm"]
+
+# The max number of seconds to wait for the report download from KSDP.
+KSDP_DOWNLOAD_TIMEOUT = 600
+
+# The number of browsers logged in to KSDP at the same time when enriching cases.
+KSDP_WORKER_COUNT = 3
+
+# A cheap KSDP endpoint that requires login, used to check saved sessions before they are reused.
+# A session is only treated as expired if the endpoint answers 401 or 403.
+# PLACEHOLDER: the path is a guess and must be replaced with a request the KSDP front end is known to make.
+# Set it to None to only check for the logout button.
+KSDP_SESSION_CHECK_PATH: str | None = "/api/bruger"
+KSDP_SESSION_CHECK_TIMEOUT = 10
+
+# How case info is fetched from KSDP.
+# "browser" clicks through the UI. "http" calls the data endpoints behind the UI with the browser's cookies.
+KSDP_BACKEND = "browser"
+KSDP_CASE_DATA_PATH = "/api/sag/{case_number}"
+KSDP_HTTP_MAX_CONCURRENT = 8
+KSDP_HTTP_TIMEOUT = 10
+
+# The number of retries of a single case in KSDP and the seconds to wait before the first retry.
+# The wait doubles on each retry.
+CASE_RETRY_COUNT = 2
+CASE_RETRY_BACKOFF = 1
+
+# The run stops early if this many cases in a row fail all their retries, as KSDP is most likely down.
+CIRCUIT_BREAKER_THRESHOLD = 10
+
+# The CVR lookups and the KSDP enrichment run as a pipeline, so they overlap.
+# The max number of cases waiting between two stages of the pipeline.
+PIPELINE_QUEUE_SIZE = 100
+
+# Queue config for sharing the cases of a run between several robots.
+# Workers claim this many cases from the queue at a time.
+CASE_QUEUE_NAME = "Rapport 34 sager"
+CASE_QUEUE_BATCH_SIZE = 25
+# The aggregator waits this many seconds for the workers to finish and checks the queue this often.
+CASE_QUEUE_AGGREGATE_TIMEOUT = 4 * 60 * 60
+CASE_QUEUE_POLL_INTERVAL = 60
+# How far back the queue is searched for the cases of a run.
+CASE_QUEUE_LOOKBACK = timedelta(days=14)
+
+# CVR lookup config
+CVR_MAX_CONCURRENT = 8
+CVR_CACHE_FILE = "cvr_cache.json"
+CVR_CACHE_TTL = timedelta(days=30)
+
+# Case cache config
+# Cases enriched within the max age are read from the cache instead of KSDP.
+CASE_CACHE_FILE = "case_cache.json"
+CASE_CACHE_MAX_AGE = timedelta(days=7)
+
+# The folder for persistent caches between runs.
+CACHE_FOLDER = os.path.join(os.path.expanduser("~"), "Rapport 34 cache")
+
+# Backfill config
+# The number of weeks requested from KSDP in each report when running a backfill.
+BACKFILL_CHUNK_WEEKS = 4
+BACKFILL_FOLDER = os.path.join(CACHE_FOLDER, "backfill")
+
+# The folder of the journal used to resume a failed run on retry.
+CHECKPOINT_FOLDER = os.path.join(CACHE_FOLDER, "checkpoint")
+
+# The folder to write the metrics of each run to.
+METRICS_FOLDER = os.path.join(CACHE_FOLDER, "metrics")
+
+# The environment variable main.py sets to the time the robot was started.
+START_TIME_VARIABLE = "ROBOT_START_TIME"
+
+# Orchestrator logs are buffered and written in batches of this size or at least this often in seconds.
+LOG_BATCH_SIZE = 50
+LOG_FLUSH_INTERVAL = 2
+
+# Email config
 SMTP_SERVER = "smtp.aarhuskommune.local"
 SMTP_PORT = 25
+# Whether to fail if the smtp server doesn't support starttls.
+SMTP_REQUIRE_TLS = True
+REPORT_SENDER = "itk-rpa@mkb.aarhus.dk"
+# Reports larger than this are split into several emails.
+MAX_ATTACHMENT_BYTES = 10_000_000
+
+# Error screenshot config
 SCREENSHOT_SENDER = "robot@friend.dk"
+ERROR_SCREENSHOT_MAX_WIDTH = 1280
+ERROR_SCREENSHOT_QUALITY = 60
+# The max total size of screenshots and time spent on error reports in a single run.
+ERROR_REPORT_MAX_BYTES = 5_000_000
+ERROR_REPORT_MAX_SECONDS = 60
 
 # Constant/Credential names
 ERROR_EMAIL = "Error Email"
@@ -1,18 +1,95 @@
-"""This module has functionality to send error screenshots via smtp."""
+"""This module has functionality to send error screenshots via smtp.
+Error reports are sent from a background thread so the robot can continue working while they are sent.
+"""
 
+import queue
 import smtplib
-from email.message import EmailMessage
-import base64
+import threading
+import time
 import traceback
+from dataclasses import dataclass
+from email.message import EmailMessage
 from io import BytesIO
+from typing import TYPE_CHECKING
+
+from robot_framework import config, metrics
+from robot_framework.sub_process import ksd_session
+
+# PIL is slow to import, so it's only loaded when an error report is made
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+@dataclass
+class _ErrorReport:
+    """A dataclass representing an error report waiting to be sent."""
+    to_address: str | list[str]
+    error_type: str
+    error_message: str
+    trace: str
+    process_name: str
+    screenshot: "Image.Image | None"
+
+
+class _ReportState:
+    """The background thread, the errors already reported and the budget spent on error reports in this run.
+    It's shared between the robot and the background thread, so every access takes the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._reported_errors: set[tuple[str, str]] = set()
+        self._bytes_sent = 0
+        self._seconds_spent = 0.0
+
+    def add_error(self, signature: tuple[str, str]) -> bool:
+        """Record an error and return False if an identical error was already reported."""
+        with self._lock:
+            if signature in self._reported_errors:
+                return False
+            self._reported_errors.add(signature)
+            return True
+
+    def seconds_left(self) -> float:
+        """Get the seconds left of config.ERROR_REPORT_MAX_SECONDS."""
+        with self._lock:
+            return max(0.0, config.ERROR_REPORT_MAX_SECONDS - self._seconds_spent)
 
-from PIL import ImageGrab
+    def fits(self, size: int) -> bool:
+        """Check if the given number of bytes fits in what's left of config.ERROR_REPORT_MAX_BYTES."""
+        with self._lock:
+            return self._bytes_sent + size <= config.ERROR_REPORT_MAX_BYTES
 
-from robot_framework import config
+    def add_spent(self, seconds: float, size: int) -> None:
+        """Add the time spent on a report and the bytes sent with it."""
+        with self._lock:
+            self._seconds_spent += seconds
+            self._bytes_sent += size
+
+    def start_worker(self) -> None:
+        """Start the background thread sending the error reports if it isn't running."""
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=_send_reports, daemon=True)
+                self._worker.start()
+
+    def take_worker(self) -> threading.Thread | None:
+        """Get the background thread if it's running and forget it, so a new one is started on the next report."""
+        with self._lock:
+            worker = self._worker
+            self._worker = None
+            return worker
+
+
+_queue: queue.Queue[_ErrorReport | None] = queue.Queue()
+_state = _ReportState()
 
 
 def send_error_screenshot(to_address: str | list[str], exception: Exception, process_name: str):
     """Sends an email with an error report, including a screenshot, when an exception occurs.
+    The screenshot is taken right away but the email is compressed and sent in the background.
+    An error identical to one already reported in this run is not sent again.
     Configuration details such as SMTP server, port, sender email, etc., should be set in 'config' module.
 
     Args:
@@ -20,26 +97,95 @@ def send_error_screenshot(to_address: str | list[str], exception: Exception, pro
         exception: The exception that triggered the error.
         process_name: Name of the process from OpenOrchestrator.
     """
-    # Create message
+    if not _state.add_error((type(exception).__name__, str(exception))):
+        metrics.increment("error_reports_collapsed")
+        return
+
+    if _state.seconds_left() == 0:
+        metrics.increment("error_reports_dropped")
+        return
+
+    report = _ErrorReport(
+        to_address=to_address,
+        error_type=type(exception).__name__,
+        error_message=str(exception),
+        trace=traceback.format_exc(),
+        process_name=process_name,
+        screenshot=_take_screenshot()
+    )
+
+    _state.start_worker()
+    _queue.put(report)
+
+
+def flush(timeout: float | None = None) -> None:
+    """Wait for all queued error reports to be sent and stop the background thread.
+    The wait is bounded by the time left of config.ERROR_REPORT_MAX_SECONDS unless a timeout is given.
+
+    Args:
+        timeout: The max number of seconds to wait.
+    """
+    worker = _state.take_worker()
+    if timeout is None:
+        timeout = _state.seconds_left()
+
+    if worker:
+        _queue.put(None)
+        worker.join(timeout)
+
+
+def _send_reports() -> None:
+    """Send error reports from the queue until a stop signal is received.
+    Reports are dropped once the time budget of the run is spent, and screenshots
+    are left out once the byte budget is spent.
+    """
+    while True:
+        report = _queue.get()
+        if report is None:
+            return
+
+        if _state.seconds_left() == 0:
+            metrics.increment("error_reports_dropped")
+            continue
+
+        start_time = time.perf_counter()
+        size = 0
+        try:
+            screenshot = _compress_screenshot(report.screenshot) if report.screenshot else None
+            if screenshot and not _state.fits(len(screenshot)):
+                screenshot = None
+
+            _send_report(report, screenshot)
+            size = len(screenshot) if screenshot else 0
+            metrics.increment("error_reports_sent")
+        # Failing to send an error report should never crash the robot.
+        # pylint: disable-next = broad-exception-caught
+        except Exception:
+            metrics.increment("error_reports_failed")
+        finally:
+            _state.add_spent(time.perf_counter() - start_time, size)
+
+
+def _send_report(report: _ErrorReport, screenshot: bytes | None) -> None:
+    """Build and send the email of a single error report.
+
+    Args:
+        report: The error report to send.
+        screenshot: The compressed screenshot to attach, if any.
+    """
     msg = EmailMessage()
-    msg['to'] = to_address
+    msg['to'] = report.to_address
     msg['from'] = config.SCREENSHOT_SENDER
-    msg['subject'] = f"Error screenshot: {process_name}"
-
-    # Take screenshot and convert to base64
-    screenshot = ImageGrab.grab()
-    buffer = BytesIO()
-    screenshot.save(buffer, format='PNG')
-    screenshot_base64 = base64.b64encode(buffer.getvalue()).decode('utf-8')
+    msg['subject'] = f"Error screenshot: {report.process_name}"
 
-    # Create an HTML message with the exception and screenshot
+    # Create an HTML message with the exception
     html_message = f"""
     <html>
         <body>
-            <p>Error type: {type(exception).__name__}</p>
-            <p>Error message: {exception}</p>
-            <p>{traceback.format_exc()}</p>
-            <img src="data:image/png;base64,{screenshot_base64}" alt="Screenshot">
+            <p>Error type: {report.error_type}</p>
+            <p>Error message: {report.error_message}</p>
+            <p>{report.trace}</p>
+            <p>{"See the attached screenshot." if screenshot else "No screenshot attached."}</p>
         </body>
     </html>
     """
@@ -47,7 +193,38 @@ def send_error_screenshot(to_address: str | list[str], exception: Exception, pro
     msg.set_content("Please enable HTML to view this message.")
     msg.add_alternative(html_message, subtype='html')
 
+    if screenshot:
+        msg.add_attachment(screenshot, maintype="image", subtype="jpeg", filename="screenshot.jpg")
+
     # Send message
-    with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as smtp:
-        smtp.starttls()
+    with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT, timeout=config.ERROR_REPORT_MAX_SECONDS) as smtp:
+        smtp.ehlo()
+        if config.SMTP_REQUIRE_TLS or smtp.has_extn("starttls"):
+            smtp.starttls()
         smtp.send_message(msg)
+
+
+def _take_screenshot() -> "Image.Image | None":
+    """Take a screenshot of the KSDP browser if one is open, else of the whole desktop."""
+    # pylint: disable-next=import-outside-toplevel
+    from PIL import Image, ImageGrab
+
+    try:
+        png = ksd_session.get_screenshot()
+        if png:
+            return Image.open(BytesIO(png))
+        return ImageGrab.grab()
+    # A missing screenshot shouldn't stop the error report.
+    # pylint: disable-next = broad-exception-caught
+    except Exception:
+        return None
+
+
+def _compress_screenshot(screenshot: "Image.Image") -> bytes:
+    """Downscale the screenshot to config.ERROR_SCREENSHOT_MAX_WIDTH and compress it as jpeg."""
+    screenshot = screenshot.convert("RGB")
+    screenshot.thumbnail((config.ERROR_SCREENSHOT_MAX_WIDTH, config.ERROR_SCREENSHOT_MAX_WIDTH * 4))
+
+    buffer = BytesIO()
+    screenshot.save(buffer, format="JPEG", quality=config.ERROR_SCREENSHOT_QUALITY, optimize=True)
+    return buffer.getvalue()
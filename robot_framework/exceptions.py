@@ -7,6 +7,7 @@ from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConn
 
 from robot_framework import config
 from robot_framework import error_screenshot
+from robot_framework.log_buffer import BufferedOrchestratorConnection
 
 
 class BusinessError(Exception):
@@ -45,4 +46,6 @@ def log_exception(orchestrator_connection: OrchestratorConnection) -> callable:
     """
     def inner(exception_type, value, traceback_string):
         orchestrator_connection.log_error(f"Uncaught Exception:\nType: {exception_type}\nValue: {value}\nTrace: {traceback_string}")
+        if isinstance(orchestrator_connection, BufferedOrchestratorConnection):
+            orchestrator_connection.close()
     return inner
@@ -3,7 +3,9 @@
 # This module is not meant to exist next to queue_framework.py in production:
 # pylint: disable=duplicate-code
 
+import os
 import sys
+import time
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
@@ -12,15 +14,20 @@ from robot_framework import reset
 from robot_framework.exceptions import BusinessError, handle_error, log_exception
 from robot_framework import process
 from robot_framework import config
+from robot_framework import metrics
+from robot_framework import error_screenshot
+from robot_framework import log_buffer
+from robot_framework.sub_process import checkpoint, backfill
 
 
 def main():
     """The entry point for the framework. Should be called as the first thing when running the robot."""
-    orchestrator_connection = OrchestratorConnection.create_connection_from_args()
+    orchestrator_connection = log_buffer.BufferedOrchestratorConnection(OrchestratorConnection.create_connection_from_args())
     sys.excepthook = log_exception(orchestrator_connection)
 
     orchestrator_connection.log_trace("Robot Framework started.")
     initialize.initialize(orchestrator_connection)
+    _log_startup_time(orchestrator_connection)
 
     error_count = 0
     for _ in range(config.MAX_RETRY_COUNT):
@@ -32,17 +39,48 @@ def main():
         # If any business rules are broken the robot should stop entirely.
         except BusinessError as error:
             handle_error("Business Error", error, None, orchestrator_connection)
+            _delete_run_data()
             break
 
         # We actually want to catch all exceptions possible here.
         # pylint: disable-next = broad-exception-caught
         except Exception as error:
             error_count += 1
+            metrics.increment("process_retries")
             handle_error(f"Process Error #{error_count}", error, None, orchestrator_connection)
 
+    if error_count == config.MAX_RETRY_COUNT:
+        _delete_run_data()
+
+    error_screenshot.flush()
+    orchestrator_connection.log_info(metrics.get_summary_line())
+    metrics.write_json(config.METRICS_FOLDER)
+
     reset.clean_up(orchestrator_connection)
     reset.close_all(orchestrator_connection)
     reset.kill_all(orchestrator_connection)
+    orchestrator_connection.close()
 
     if config.FAIL_ROBOT_ON_TOO_MANY_ERRORS and error_count == config.MAX_RETRY_COUNT:
         raise RuntimeError("Process failed too many times.")
+
+
+def _delete_run_data() -> None:
+    """Delete the journal and the backfill reports of a run that has failed for good.
+    They are only kept for the next retry and hold personal data like CPR numbers.
+    """
+    checkpoint.delete_journal()
+    backfill.delete_all_reports()
+
+
+def _log_startup_time(orchestrator_connection: OrchestratorConnection) -> None:
+    """Log and record the time from main.py started until the robot is ready for its first action.
+    Nothing is logged if the robot wasn't started through main.py.
+    """
+    start_time = os.getenv(config.START_TIME_VARIABLE)
+    if not start_time:
+        return
+
+    seconds = time.time() - float(start_time)
+    metrics.record("time_to_first_action", seconds)
+    orchestrator_connection.log_info(f"Time to first action: {seconds:.1f}s")
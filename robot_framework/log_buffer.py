@@ -0,0 +1,121 @@
+"""This module contains a wrapper around OrchestratorConnection that writes logs from a background thread,
+so logging doesn't add database latency to the process.
+"""
+
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+
+
+class BufferedOrchestratorConnection:
+    """Wraps an OrchestratorConnection and buffers calls to log_trace, log_info and log_error.
+    Buffered messages are written in order in batches by a background thread,
+    when the batch size is reached or the flush interval has passed.
+    All other attributes are passed through to the wrapped connection.
+    """
+
+    def __init__(self, connection: OrchestratorConnection, batch_size: int = config.LOG_BATCH_SIZE,
+                 flush_interval: float = config.LOG_FLUSH_INTERVAL):
+        """
+        Args:
+            connection: The connection to wrap.
+            batch_size: The number of buffered messages that triggers a write.
+            flush_interval: The max number of seconds a message is buffered.
+        """
+        self._connection = connection
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._write_logs, daemon=True)
+        self._thread.start()
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+    def log_trace(self, message: str) -> None:
+        """Buffer a trace log."""
+        self._log(self._connection.log_trace, message)
+
+    def log_info(self, message: str) -> None:
+        """Buffer an info log."""
+        self._log(self._connection.log_info, message)
+
+    def log_error(self, message: str) -> None:
+        """Buffer an error log."""
+        self._log(self._connection.log_error, message)
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Wait until all messages buffered so far are written.
+
+        Args:
+            timeout: The max number of seconds to wait.
+        """
+        if not self._thread.is_alive():
+            return
+
+        done = threading.Event()
+        self._queue.put((done.set, None))
+        done.wait(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write all buffered messages and stop the background thread.
+        Any messages logged afterwards are written directly.
+
+        Args:
+            timeout: The max number of seconds to wait.
+        """
+        if not self._thread.is_alive():
+            return
+
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _log(self, log_function: Callable[[str], None], message: str) -> None:
+        """Buffer a message or write it directly if the buffer is closed."""
+        if self._closed:
+            log_function(message)
+        else:
+            self._queue.put((log_function, message))
+
+    def _write_logs(self) -> None:
+        """Collect messages from the queue and write them in batches until the stop signal is received."""
+        batch = []
+        stop = False
+
+        while not stop:
+            deadline = time.monotonic() + self._flush_interval
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+
+                if item is None:
+                    stop = True
+                    break
+
+                batch.append(item)
+
+                # A flush request ends the batch early
+                if item[1] is None:
+                    break
+
+            for log_function, message in batch:
+                try:
+                    if message is None:
+                        log_function()
+                    else:
+                        log_function(message)
+                # A failing log write shouldn't stop the rest of the log.
+                # pylint: disable-next = broad-exception-caught
+                except Exception:
+                    pass
+
+            batch.clear()
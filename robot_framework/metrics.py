@@ -0,0 +1,121 @@
+"""This module collects timings and counters during a run and reports them at the end.
+All functions are safe to call from multiple threads.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+_timings: dict[str, list[float]] = {}
+_counters: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str):
+    """Time the code inside the with block and record it under the given name.
+    The time is recorded even if the block raises an exception.
+
+    Args:
+        name: The name of the span, e.g. the phase of the process.
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start_time)
+
+
+def record(name: str, seconds: float) -> None:
+    """Record a timing under the given name.
+
+    Args:
+        name: The name of the timing.
+        seconds: The duration in seconds.
+    """
+    with _lock:
+        _timings.setdefault(name, []).append(seconds)
+
+
+def increment(name: str, count: int = 1) -> None:
+    """Increment the counter with the given name.
+
+    Args:
+        name: The name of the counter, e.g. "timeouts".
+        count: The amount to add to the counter.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + count
+
+
+def get_summary() -> dict:
+    """Summarize the timings and counters recorded so far.
+
+    Returns:
+        A dict with the count, total, average, percentiles and max of each timing
+        and the value of each counter.
+    """
+    with _lock:
+        timings = {name: sorted(values) for name, values in _timings.items()}
+        counters = dict(_counters)
+
+    summary = {}
+    for name, values in timings.items():
+        summary[name] = {
+            "count": len(values),
+            "total": round(sum(values), 3),
+            "avg": round(sum(values) / len(values), 3),
+            "p50": round(_percentile(values, 50), 3),
+            "p90": round(_percentile(values, 90), 3),
+            "p99": round(_percentile(values, 99), 3),
+            "max": round(values[-1], 3)
+        }
+
+    return {"timings": summary, "counters": counters}
+
+
+def get_summary_line() -> str:
+    """Get a one line summary of the run suitable for the Orchestrator log."""
+    summary = get_summary()
+
+    parts = []
+    for name, timing in summary['timings'].items():
+        if timing['count'] == 1:
+            parts.append(f"{name}: {timing['total']:.1f}s")
+        else:
+            parts.append(f"{name}: {timing['count']}x {timing['total']:.1f}s (p50 {timing['p50']:.2f}s, p90 {timing['p90']:.2f}s, max {timing['max']:.2f}s)")
+
+    parts += [f"{name}: {value}" for name, value in summary['counters'].items()]
+    return "Metrics - " + ", ".join(parts)
+
+
+def write_json(folder: str) -> str:
+    """Write the summary as a json file named by the current time.
+
+    Args:
+        folder: The folder to write the file in.
+
+    Returns:
+        The path to the written file.
+    """
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"metrics {datetime.now():%Y-%m-%d %H-%M-%S}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(get_summary(), file, indent=2)
+    return path
+
+
+def reset() -> None:
+    """Discard all recorded timings and counters."""
+    with _lock:
+        _timings.clear()
+        _counters.clear()
+
+
+def _percentile(sorted_values: list[float], percent: int) -> float:
+    """Get the percentile of a sorted list using the nearest rank method."""
+    index = max(0, -(-len(sorted_values) * percent // 100) - 1)
+    return sorted_values[index]
@@ -1,51 +1,293 @@
 """This module contains the main process of the robot."""
 
 import os
-import uuid
+from collections.abc import Callable, Iterable
 from datetime import datetime, timedelta
 
+from selenium import webdriver
+from OpenOrchestrator.database.queues import QueueElement
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from itk_dev_shared_components.smtp import smtp_util
-from itk_dev_shared_components.smtp.smtp_util import EmailAttachment
-from itk_dev_shared_components.misc import cvr_lookup
 
-from robot_framework import config
-from robot_framework.sub_process import ksd_process, excel_process
+from robot_framework import config, metrics, process_arguments
+from robot_framework.sub_process import ksd_process, ksd_pool, cvr_process, case_cache, delivery, backfill, checkpoint, ksd_session, ksd_http, report_definition, pipeline, case_retry
+from robot_framework.sub_process import excel_process, case_queue
+from robot_framework.sub_process.ksd_process import Case
 
 
 def process(orchestrator_connection: OrchestratorConnection) -> None:
     """Do the primary process of the robot."""
     orchestrator_connection.log_trace("Running process.")
-    cvr_creds = orchestrator_connection.get_credential(config.CVR_CREDS)
+    arguments = process_arguments.parse_arguments(orchestrator_connection.process_arguments)
+    period, run_key = _get_period(arguments)
+
+    # The aggregator only reads the queue and never opens KSDP
+    if arguments.mode == process_arguments.AGGREGATE_MODE:
+        _aggregate(orchestrator_connection, arguments.reports, run_key, period)
+        return
+
+    with metrics.span("login"):
+        browser = ksd_session.get_browser(orchestrator_connection)
+
+    if arguments.mode == process_arguments.WORKER_MODE:
+        _work(orchestrator_connection, browser)
+        return
+
+    # Resume from the journal of an earlier failed attempt if any
+    journal = checkpoint.CheckpointJournal(run_key)
+
+    cases = _get_cases(orchestrator_connection, browser, arguments, journal)
+
+    if arguments.mode == process_arguments.DISPATCH_MODE:
+        published_count = case_queue.publish_cases(orchestrator_connection, run_key, cases)
+        orchestrator_connection.log_info(f"Published {published_count} of {len(cases)} cases to the queue '{config.CASE_QUEUE_NAME}'.")
+    else:
+        orchestrator_connection.log_info(f"Searching info on {len(cases)} cases.")
+        errors = _enrich_cases(orchestrator_connection, browser, cases, journal)
+        _send_reports(orchestrator_connection, arguments.reports, cases, errors, period, journal=journal)
 
-    browser = ksd_process.login(orchestrator_connection)
+    journal.clear()
+    if arguments.is_backfill:
+        backfill.delete_reports(backfill.get_report_paths(arguments.from_date, arguments.to_date))
 
-    # Create report
-    folder = os.getcwd()
-    report_path = os.path.join(folder, f"{uuid.uuid4()}.csv")
+
+def _get_period(arguments: process_arguments.ProcessArguments) -> tuple[str, str]:
+    """Get the display name of the report period and a key identifying it.
+    Without a backfill range the period is last week.
+    """
+    if arguments.is_backfill:
+        return f"{arguments.from_date} til {arguments.to_date}", f"{arguments.from_date}_{arguments.to_date}"
 
     year, week_number, _ = (datetime.today() - timedelta(weeks=1)).isocalendar()
+    return f"uge {week_number}", f"{year}-W{week_number:02}"
+
+
+def _get_cases(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome,
+               arguments: process_arguments.ProcessArguments, journal: checkpoint.CheckpointJournal) -> list[Case]:
+    """Download and read the report for the period of the run.
+    The cases are loaded from the journal instead if an earlier attempt got that far.
+    """
+    cases = journal.load_cases()
+    if cases is not None:
+        orchestrator_connection.log_info("Resuming from checkpoint.")
+        return cases
+
+    # Read the cases of all reports at once, so each case is only enriched once
+    absentee_types, excluded_statuses = report_definition.get_union_filter(arguments.reports)
+
+    if arguments.is_backfill:
+        with metrics.span("create_report"):
+            report_paths = backfill.download_reports(browser, arguments.from_date, arguments.to_date)
+        with metrics.span("read_csv_file"):
+            cases = list(backfill.merge_reports(report_paths, absentee_types, excluded_statuses))
+    else:
+        year, week_number, _ = (datetime.today() - timedelta(weeks=1)).isocalendar()
+        with metrics.span("create_report"):
+            report = ksd_process.download_report(browser, year, week_number, year, week_number)
+        with metrics.span("read_csv_file"):
+            cases = list(ksd_process.iter_csv(report, absentee_types, excluded_statuses))
+
+    journal.save_cases(cases)
+    return cases
+
+
+def _enrich_cases(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome,
+                  cases: list[Case], journal: checkpoint.CheckpointJournal) -> dict[str, Exception]:
+    """Set the company type on all cases and get info from KSDP.
+    Single cases that fail are returned, so the rest can still be reported.
+
+    Raises:
+        RuntimeError: If the circuit breaker opened because too many cases in a row failed.
+
+    Returns:
+        A dict of case numbers and the error that stopped each case from being enriched.
+    """
+    breaker = case_retry.CircuitBreaker()
+
+    with metrics.span("enrich_pipeline"):
+        errors = _enrich_pipelined(orchestrator_connection, browser, cases, journal, breaker)
+
+    if breaker.is_open:
+        raise RuntimeError(f"KSDP seems to be down. Stopped after {breaker.threshold} cases in a row failed.")
+
+    if errors:
+        metrics.increment("failed_cases", len(errors))
+        orchestrator_connection.log_error(f"Couldn't get info on {len(errors)} cases: {', '.join(errors)}")
+
+    return errors
+
+
+def _enrich_pipelined(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome,
+                      cases: list[Case], journal: checkpoint.CheckpointJournal, breaker: case_retry.CircuitBreaker) -> dict[str, Exception]:
+    """Set the company type on all cases and get info from KSDP on all cases not already
+    in the journal or the case cache, with the CVR lookups and KSDP running as a pipeline.
+    """
+    new_cases = _get_new_cases(orchestrator_connection, cases, journal)
+
+    cvr_creds = orchestrator_connection.get_credential(config.CVR_CREDS)
+    lookup = cvr_process.CompanyTypeLookup(cvr_creds.username, cvr_creds.password)
+    try:
+        errors = pipeline.enrich_cases(cases, {c.case_number for c in new_cases}, lookup,
+                                       _get_ksdp_function(orchestrator_connection, browser, journal.append_enriched_case, len(new_cases), breaker))
+    finally:
+        lookup.save()
+    orchestrator_connection.log_info(f"CVR lookups: {len(lookup.hits)} cached, {len(lookup.lookups)} looked up.")
+
+    case_cache.save_cases([c for c in new_cases if c.case_number not in errors])
+    return errors
+
+
+def _get_new_cases(orchestrator_connection: OrchestratorConnection, cases: list[Case], journal: checkpoint.CheckpointJournal) -> list[Case]:
+    """Fill out the cases found in the journal or the case cache and return the rest."""
+    remaining_cases = journal.apply_enriched_cases(cases)
+    cached_cases, new_cases = case_cache.apply_cache(remaining_cases)
+    orchestrator_connection.log_info(f"Case cache: {len(cached_cases)} hits, {len(new_cases)} misses. {len(cases) - len(remaining_cases)} resumed from checkpoint.")
+    return new_cases
+
+
+def _get_ksdp_function(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome,
+                       on_case_done: Callable[[Case], None] | None, case_count: int,
+                       breaker: case_retry.CircuitBreaker) -> Callable[[Iterable[Case]], dict[str, Exception]]:
+    """Get a function enriching cases from KSDP with the configured backend.
+    The on_case_done function is called with each case as it's done, e.g. to add it to the journal.
+    The case count limits the number of browsers logged in.
+    """
+    if config.KSDP_BACKEND == "http":
+        session = ksd_http.create_session(browser)
+        return lambda cases: ksd_http.get_case_infos(session, cases, on_case_done=on_case_done, breaker=breaker)
+
+    worker_count = min(config.KSDP_WORKER_COUNT, case_count)
+    return lambda cases: ksd_pool.get_case_infos(orchestrator_connection, browser, cases, on_case_done=on_case_done,
+                                                 worker_count=worker_count, breaker=breaker)
+
+
+def _work(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome) -> None:
+    """Claim cases from the queue in batches and enrich them until the queue is empty.
+    Each queue element is marked as done with the enriched fields of its case or as failed with its error.
+
+    Raises:
+        RuntimeError: If the circuit breaker opened because too many cases in a row failed.
+    """
+    breaker = case_retry.CircuitBreaker()
+    cvr_creds = orchestrator_connection.get_credential(config.CVR_CREDS)
+    lookup = cvr_process.CompanyTypeLookup(cvr_creds.username, cvr_creds.password)
+
+    case_count = 0
+    error_count = 0
+    try:
+        while not breaker.is_open and (claimed := case_queue.claim_cases(orchestrator_connection)):
+            with metrics.span("enrich_queue_batch"):
+                error_count += _work_batch(orchestrator_connection, browser, claimed, lookup, breaker)
+            case_count += len(claimed)
+    finally:
+        lookup.save()
+
+    orchestrator_connection.log_info(f"Worker done. {case_count} cases handled, {error_count} failed.")
+    if error_count:
+        metrics.increment("failed_cases", error_count)
+
+    if breaker.is_open:
+        raise RuntimeError(f"KSDP seems to be down. Stopped after {breaker.threshold} cases in a row failed.")
+
+
+def _work_batch(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome, claimed: list[tuple[QueueElement, Case]],
+                lookup: cvr_process.CompanyTypeLookup, breaker: case_retry.CircuitBreaker) -> int:
+    """Enrich a batch of claimed cases and mark their queue elements.
+    Cases skipped because the circuit breaker opened are set back to new.
+    If the batch is stopped by an unexpected error, all its elements are marked as failed.
+
+    Returns:
+        The number of cases that failed.
+    """
+    cases = [c for _, c in claimed]
+    try:
+        _, new_cases = case_cache.apply_cache(cases)
+        errors = pipeline.enrich_cases(cases, {c.case_number for c in new_cases}, lookup,
+                                       _get_ksdp_function(orchestrator_connection, browser, None, len(new_cases), breaker))
+        case_cache.save_cases([c for c in new_cases if c.case_number not in errors])
+    except Exception as error:
+        for element, _ in claimed:
+            case_queue.fail_case(orchestrator_connection, element, _format_error(error))
+        raise
+
+    failed_count = 0
+    for element, _case in claimed:
+        error = errors.get(_case.case_number)
+        if isinstance(error, case_retry.CircuitOpenError):
+            # The case was never tried, so leave it for a worker on a retry or another machine
+            case_queue.release_case(orchestrator_connection, element)
+        elif error is not None:
+            case_queue.fail_case(orchestrator_connection, element, _format_error(error))
+            failed_count += 1
+        else:
+            case_queue.complete_case(orchestrator_connection, element, _case)
+    return failed_count
+
+
+def _aggregate(orchestrator_connection: OrchestratorConnection, reports: list[report_definition.ReportDefinition],
+               run_key: str, period: str) -> None:
+    """Wait for the workers to finish the cases of the run, send the reports and delete the run from the queue."""
+    with metrics.span("collect_queue"):
+        cases, errors = case_queue.collect_cases(orchestrator_connection, run_key)
+    orchestrator_connection.log_info(f"Collected {len(cases)} cases from the queue '{config.CASE_QUEUE_NAME}'.")
+
+    if errors:
+        metrics.increment("failed_cases", len(errors))
+        orchestrator_connection.log_error(f"Couldn't get info on {len(errors)} cases: {', '.join(errors)}")
+
+    # The dispatcher is done with its journal once the run is collected, so this doesn't share it
+    journal = checkpoint.CheckpointJournal(run_key)
+    _send_reports(orchestrator_connection, reports, cases, errors, period, journal=journal)
+
+    deleted_count = case_queue.delete_run(orchestrator_connection, run_key)
+    orchestrator_connection.log_info(f"Deleted {deleted_count} elements of the run from the queue '{config.CASE_QUEUE_NAME}'.")
+    journal.clear()
+
+
+def _send_reports(orchestrator_connection: OrchestratorConnection, reports: list[report_definition.ReportDefinition],
+                  cases: list[Case], errors: dict[str, Exception], period: str, *, journal: checkpoint.CheckpointJournal) -> None:
+    """Write the cases of each report to Excel and send all the reports over one SMTP connection.
+    Cases that couldn't be enriched are left out and listed on a separate sheet,
+    and the report is marked as partial in the subject.
+    Emails sent by an earlier attempt according to the journal are skipped, so a retry doesn't send them twice.
+    """
+    excel_paths = []
+    try:
+        emails = []
+        with metrics.span("write_excel"):
+            for report in reports:
+                report_cases = [c for c in cases if report_definition.matches(report, c)]
+                failed_cases = [(c.case_number, _format_error(errors[c.case_number])) for c in report_cases if c.case_number in errors]
+                report_cases = [c for c in report_cases if c.case_number not in errors]
+                orchestrator_connection.log_info(f"{report.name}: {len(report_cases)} cases, {len(failed_cases)} failed.")
+
+                report_paths = delivery.write_report_parts(report_cases, report.columns, failed_cases)
+                excel_paths += report_paths
+
+                subject = f"Sygedagpenge {report.name} - {period}"
+                body = f"Her er den berigede {report.name} for {period}."
+                if failed_cases:
+                    subject = f"DELVIS - {subject}"
+                    body += f"\n\nRapporten er delvis. {len(failed_cases)} sager kunne ikke hentes og er listet på arket '{excel_process.FAILED_SHEET_TITLE}'."
+                emails += delivery.create_report_emails(report.receivers, subject, f"{body}\n\nVenlig hilsen\nRobotten",
+                                                        f"{report.name} {period}", report_paths)
 
-    ksd_process.create_report(browser, year, week_number, year, week_number,  report_path)
-    cases = ksd_process.read_csv_file(report_path)
-    os.remove(report_path)
+        unsent_emails = [e for e in emails if not journal.is_done(_get_email_step(e))]
+        if len(unsent_emails) < len(emails):
+            orchestrator_connection.log_info(f"Skipping {len(emails) - len(unsent_emails)} emails sent by an earlier attempt.")
+        delivery.send_emails(unsent_emails, on_sent=lambda e: journal.mark_done(_get_email_step(e)))
+    finally:
+        for path in excel_paths:
+            os.remove(path)
 
-    orchestrator_connection.log_info(f"Searching info on {len(cases)} cases.")
 
-    # Get company type on each case
-    for c in cases:
-        c.company_type = cvr_lookup.cvr_lookup(c.cvr_number, cvr_creds.username, cvr_creds.password).company_type
+def _get_email_step(email: delivery.Email) -> str:
+    """Get the journal step of sending an email."""
+    return f"email:{delivery.get_email_key(email)}"
 
-    # Get info from ksd
-    for c in cases:
-        ksd_process.get_case_info(browser, c)
 
-    excel_file = excel_process.write_excel(cases)
-    receivers = orchestrator_connection.process_arguments.split(",")
-    smtp_util.send_email(receivers, "itk-rpa@mkb.aarhus.dk", f"Sygedagpenge Rapport 34 - uge {week_number}",
-                         f"Her er den berigede rapport 34 for uge {week_number}.\n\nVenlig hilsen\nRobotten",
-                         smtp_server=config.SMTP_SERVER, smtp_port=config.SMTP_PORT,
-                         attachments=[EmailAttachment(excel_file, f"Rapport 34 uge {week_number}.xlsx")])
+def _format_error(error: Exception) -> str:
+    """Format an error for the sheet of failed cases."""
+    return f"{type(error).__name__}: {error}"[:500]
 
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+"""This module handles parsing the process arguments given from OpenOrchestrator."""
+
+import json
+from dataclasses import dataclass
+from datetime import date
+
+from robot_framework.sub_process import report_definition
+from robot_framework.sub_process.report_definition import ReportDefinition
+
+# The modes of a run. A single run does everything itself.
+# The others split a run between a dispatcher, any number of workers and an aggregator, see case_queue.
+SINGLE_MODE = "single"
+DISPATCH_MODE = "dispatch"
+WORKER_MODE = "worker"
+AGGREGATE_MODE = "aggregate"
+MODES = (SINGLE_MODE, DISPATCH_MODE, WORKER_MODE, AGGREGATE_MODE)
+
+
+@dataclass
+class ProcessArguments:
+    """A dataclass representing the arguments of a single run."""
+    reports: list[ReportDefinition]
+    from_date: date | None = None
+    to_date: date | None = None
+    mode: str = SINGLE_MODE
+
+    @property
+    def is_backfill(self) -> bool:
+        """Whether the run should cover a date range instead of last week."""
+        return self.from_date is not None
+
+
+def parse_arguments(arguments: str) -> ProcessArguments:
+    """Parse the process arguments.
+    The arguments are either a comma separated list of receivers or a json object like:
+    {"receivers": ["a@b.dk"], "from_date": "2024-01-01", "to_date": "2024-03-31"}
+    Instead of receivers the json object can contain a list of report definitions:
+    {"reports": [{"name": "Rapport 34", "receivers": ["a@b.dk"]}, ...]}
+    See report_definition.from_dict for the format of a definition.
+    The json object can also set the mode of the run, e.g. {"mode": "worker"}.
+    A worker doesn't need any reports, as it gets its cases from the queue.
+
+    Args:
+        arguments: The process arguments string.
+
+    Raises:
+        ValueError: If only one of from_date and to_date is given or they are in the wrong order,
+                    if the mode is unknown or if no reports are defined outside worker mode.
+
+    Returns:
+        The parsed arguments.
+    """
+    if not arguments.strip().startswith("{"):
+        return ProcessArguments(reports=[ReportDefinition(report_definition.DEFAULT_NAME, arguments.split(","))])
+
+    arguments_dict = json.loads(arguments)
+    mode = arguments_dict.get("mode", SINGLE_MODE)
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode '{mode}'. Must be one of {MODES}.")
+
+    from_date = arguments_dict.get("from_date")
+    to_date = arguments_dict.get("to_date")
+
+    if bool(from_date) != bool(to_date):
+        raise ValueError("Both from_date and to_date must be given for a backfill.")
+
+    if "reports" in arguments_dict:
+        reports = [report_definition.from_dict(r) for r in arguments_dict["reports"]]
+    elif "receivers" in arguments_dict:
+        reports = [ReportDefinition(report_definition.DEFAULT_NAME, arguments_dict["receivers"])]
+    else:
+        reports = []
+
+    if not reports and mode != WORKER_MODE:
+        raise ValueError("At least one report must be defined.")
+
+    args = ProcessArguments(
+        reports=reports,
+        from_date=date.fromisoformat(from_date) if from_date else None,
+        to_date=date.fromisoformat(to_date) if to_date else None,
+        mode=mode
+    )
+
+    if args.is_backfill and args.from_date > args.to_date:
+        raise ValueError("from_date must be before to_date.")
+
+    return args
@@ -2,29 +2,54 @@
 
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
 
+from robot_framework.log_buffer import BufferedOrchestratorConnection
+from robot_framework.sub_process import ksd_session
+
 
 def reset(orchestrator_connection: OrchestratorConnection) -> None:
-    """Clean up, close/kill all programs and start them again. """
+    """Clean up, close/kill all programs and start them again.
+    The KSDP sessions are kept alive so a retry doesn't need to log in again.
+    """
     orchestrator_connection.log_trace("Resetting.")
     clean_up(orchestrator_connection)
-    close_all(orchestrator_connection)
-    kill_all(orchestrator_connection)
+    close_all(orchestrator_connection, keep_sessions=True)
+    kill_all(orchestrator_connection, keep_sessions=True)
     open_all(orchestrator_connection)
 
 
 def clean_up(orchestrator_connection: OrchestratorConnection) -> None:
-    """Do any cleanup needed to leave a blank slate."""
+    """Do any cleanup needed to leave a blank slate.
+    Writes any buffered log messages.
+    """
     orchestrator_connection.log_trace("Doing cleanup.")
+    if isinstance(orchestrator_connection, BufferedOrchestratorConnection):
+        orchestrator_connection.flush()
+
 
+def close_all(orchestrator_connection: OrchestratorConnection, keep_sessions: bool = False) -> None:
+    """Gracefully close all applications used by the robot.
 
-def close_all(orchestrator_connection: OrchestratorConnection) -> None:
-    """Gracefully close all applications used by the robot."""
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        keep_sessions: Whether to keep the KSDP sessions logged in and only close their tabs.
+    """
     orchestrator_connection.log_trace("Closing all applications.")
+    if keep_sessions:
+        ksd_session.reset_sessions()
+    else:
+        ksd_session.close_all()
+
 
+def kill_all(orchestrator_connection: OrchestratorConnection, keep_sessions: bool = False) -> None:
+    """Forcefully close all applications used by the robot.
 
-def kill_all(orchestrator_connection: OrchestratorConnection) -> None:
-    """Forcefully close all applications used by the robot."""
+    Args:
+        orchestrator_connection: The connection to OpenOrchestrator.
+        keep_sessions: Whether to leave the KSDP sessions alive.
+    """
     orchestrator_connection.log_trace("Killing all applications.")
+    if not keep_sessions:
+        ksd_session.kill_all()
 
 
 def open_all(orchestrator_connection: OrchestratorConnection) -> None:
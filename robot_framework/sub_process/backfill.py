@@ -0,0 +1,125 @@
+"""This module handles downloading rapport 34 for long date ranges in chunks of weeks."""
+
+import os
+import shutil
+from collections.abc import Collection, Iterator
+from datetime import date, timedelta
+
+from selenium import webdriver
+
+from robot_framework import config
+from robot_framework.sub_process import ksd_process
+from robot_framework.sub_process.ksd_process import Case
+
+
+def get_week_chunks(from_date: date, to_date: date, chunk_weeks: int) -> list[tuple[date, date]]:
+    """Split a date range into chunks of whole weeks.
+
+    Args:
+        from_date: A date in the first week of the range.
+        to_date: A date in the last week of the range.
+        chunk_weeks: The max number of weeks in each chunk.
+
+    Returns:
+        A list of tuples of the monday of the first week and the monday of the last week in each chunk.
+    """
+    start = from_date - timedelta(days=from_date.weekday())
+    end = to_date - timedelta(days=to_date.weekday())
+
+    chunks = []
+    while start <= end:
+        chunk_end = min(start + timedelta(weeks=chunk_weeks - 1), end)
+        chunks.append((start, chunk_end))
+        start = chunk_end + timedelta(weeks=1)
+
+    return chunks
+
+
+def get_report_paths(from_date: date, to_date: date) -> list[str]:
+    """Get the paths to save the report chunks of the given date range at.
+
+    Args:
+        from_date: A date in the first week of the range.
+        to_date: A date in the last week of the range.
+
+    Returns:
+        A list of the paths to the chunks in chronological order.
+    """
+    return [path for path, _, _ in _get_report_chunks(from_date, to_date)]
+
+
+def download_reports(browser: webdriver.Chrome, from_date: date, to_date: date) -> list[str]:
+    """Download rapport 34 for the given date range in chunks of config.BACKFILL_CHUNK_WEEKS weeks.
+    Chunks already downloaded in an earlier run are reused unless they cover
+    the current week, since its data can still change.
+
+    Args:
+        browser: A browser logged in to KSDP.
+        from_date: A date in the first week of the range.
+        to_date: A date in the last week of the range.
+
+    Returns:
+        The paths of the downloaded reports in chronological order.
+    """
+    os.makedirs(config.BACKFILL_FOLDER, exist_ok=True)
+    current_week = date.today() - timedelta(days=date.today().weekday())
+
+    paths = []
+    for path, chunk_start, chunk_end in _get_report_chunks(from_date, to_date):
+        paths.append(path)
+
+        if os.path.isfile(path) and chunk_end < current_week:
+            continue
+
+        if os.path.isfile(path):
+            os.remove(path)
+
+        year_from, week_from, _ = chunk_start.isocalendar()
+        year_to, week_to, _ = chunk_end.isocalendar()
+        ksd_process.create_report(browser, year_from, week_from, year_to, week_to, path)
+
+    return paths
+
+
+def merge_reports(paths: list[str], absentee_types: Collection[str], excluded_statuses: Collection[str]) -> Iterator[Case]:
+    """Read the given reports one at a time and yield each case only once.
+
+    Args:
+        paths: The paths of the reports to merge.
+        absentee_types: The values of Sygemeldt-Type to include.
+        excluded_statuses: Cases with a Sagsstatus containing any of these are left out.
+
+    Yields:
+        The relevant cases across all reports without duplicate case numbers.
+    """
+    seen = set()
+    for path in paths:
+        for _case in ksd_process.iter_csv_file(path, absentee_types, excluded_statuses):
+            if _case.case_number not in seen:
+                seen.add(_case.case_number)
+                yield _case
+
+
+def delete_reports(paths: list[str]) -> None:
+    """Delete the given downloaded reports."""
+    for path in paths:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def delete_all_reports() -> None:
+    """Delete every downloaded report in config.BACKFILL_FOLDER.
+    Used when a run has failed for good, so the reports aren't kept on disk.
+    """
+    shutil.rmtree(config.BACKFILL_FOLDER, ignore_errors=True)
+
+
+def _get_report_chunks(from_date: date, to_date: date) -> list[tuple[str, date, date]]:
+    """Get the file path, first week and last week of each report chunk in the date range."""
+    chunks = []
+    for chunk_start, chunk_end in get_week_chunks(from_date, to_date, config.BACKFILL_CHUNK_WEEKS):
+        year_from, week_from, _ = chunk_start.isocalendar()
+        year_to, week_to, _ = chunk_end.isocalendar()
+        path = os.path.join(config.BACKFILL_FOLDER, f"R34 {year_from}-W{week_from:02} {year_to}-W{week_to:02}.csv")
+        chunks.append((path, chunk_start, chunk_end))
+    return chunks
@@ -0,0 +1,95 @@
+"""This module handles a persistent cache of case info fetched from KSDP,
+so cases enriched in earlier runs don't need to be opened in the browser again.
+"""
+
+import os
+from datetime import date
+
+from robot_framework import config
+from robot_framework.sub_process import file_cache
+from robot_framework.sub_process.ksd_process import Case
+
+# The case fields filled out by ksd_process.get_case_info
+CACHED_FIELDS = (
+    "phone_number",
+    "absence_reason",
+    "absence_reason_note",
+    "partial_incapacity_date",
+    "partial_incapacity_status"
+)
+
+DATE_FIELDS = ("partial_incapacity_date",)
+
+
+def apply_cache(cases: list[Case]) -> tuple[list[Case], list[Case]]:
+    """Fill out case info from the cache on all cases with a fresh cache entry.
+    Entries older than config.CASE_CACHE_MAX_AGE are ignored.
+
+    Args:
+        cases: The cases to look up in the cache.
+
+    Returns:
+        A list of cases filled out from the cache and a list of cases not found in the cache.
+    """
+    cache = file_cache.load_cache(_cache_path(), config.CASE_CACHE_MAX_AGE)
+
+    hits = []
+    misses = []
+    for _case in cases:
+        entry = cache.get(_case.case_number)
+        if entry:
+            set_fields(_case, entry['value'])
+            hits.append(_case)
+        else:
+            misses.append(_case)
+
+    return hits, misses
+
+
+def save_cases(cases: list[Case]) -> None:
+    """Save the case info of the given cases in the cache.
+
+    Args:
+        cases: The enriched cases to save.
+    """
+    cache_path = _cache_path()
+    cache = file_cache.load_cache(cache_path, config.CASE_CACHE_MAX_AGE)
+
+    for _case in cases:
+        cache[_case.case_number] = file_cache.create_entry(get_fields(_case))
+
+    file_cache.save_cache(cache_path, cache)
+
+
+def get_fields(_case: Case) -> dict[str, str | None]:
+    """Get the cached fields of a case as a json serializable dict.
+
+    Args:
+        _case: The enriched case.
+
+    Returns:
+        A dict of the cached field names and values with dates in iso format.
+    """
+    values = {field: getattr(_case, field) for field in CACHED_FIELDS}
+    for field in DATE_FIELDS:
+        if values[field]:
+            values[field] = values[field].isoformat()
+    return values
+
+
+def set_fields(_case: Case, values: dict[str, str | None]) -> None:
+    """Set the cached fields on a case from a dict created by get_fields.
+
+    Args:
+        _case: The case to fill out.
+        values: A dict created by get_fields.
+    """
+    for field in CACHED_FIELDS:
+        value = values.get(field)
+        if field in DATE_FIELDS and value:
+            value = date.fromisoformat(value)
+        setattr(_case, field, value)
+
+
+def _cache_path() -> str:
+    return os.path.join(config.CACHE_FOLDER, config.CASE_CACHE_FILE)
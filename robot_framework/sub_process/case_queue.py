@@ -0,0 +1,281 @@
+"""This module handles sharing the cases of a run between several robots through an OpenOrchestrator queue.
+A dispatcher publishes one queue element per case, any number of workers claim and enrich them,
+and an aggregator collects the enriched cases once all elements are done.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from OpenOrchestrator.database.queues import QueueElement, QueueStatus
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config, metrics
+from robot_framework.sub_process import case_cache, ksd_process
+from robot_framework.sub_process.ksd_process import Case
+
+# The case fields filled out by the workers
+ENRICHED_FIELDS = ("company_type",) + case_cache.CACHED_FIELDS
+
+# The max length of a queue element message
+MAX_MESSAGE_LENGTH = 1000
+
+# The number of queue elements read from Orchestrator at a time
+_PAGE_SIZE = 1000
+
+# The last part of the reference of the element marking that all cases of a run are published
+_DISPATCHED = "dispatched"
+
+# The key in a result message telling that the absence note was shortened to fit
+_NOTE_TRUNCATED = "absence_reason_note_truncated"
+
+
+class WorkerError(Exception):
+    """The error a worker reported on a case it couldn't enrich."""
+
+
+def publish_cases(orchestrator_connection: OrchestratorConnection, run_key: str, cases: list[Case]) -> int:
+    """Publish a queue element for each case of the run followed by an element marking the run as dispatched.
+    The marker holds the number of cases and is set to done right away, so workers leave it alone.
+    Cases already published for the run are skipped, so a retried dispatch doesn't publish them twice.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        run_key: The key identifying the run.
+        cases: The cases to publish.
+
+    Returns:
+        The number of queue elements published.
+    """
+    published = _get_run_elements(orchestrator_connection, run_key)
+
+    references = []
+    data = []
+    for index, _case in enumerate(cases):
+        if _case.case_number not in published:
+            references.append(f"{run_key}/{index:06}/{_case.case_number}")
+            data.append(json.dumps(ksd_process.case_to_dict(_case), ensure_ascii=False))
+
+    if references:
+        orchestrator_connection.bulk_create_queue_elements(config.CASE_QUEUE_NAME, tuple(references), tuple(data),
+                                                           created_by=orchestrator_connection.process_name)
+
+    if _DISPATCHED not in published:
+        marker = orchestrator_connection.create_queue_element(config.CASE_QUEUE_NAME, f"{run_key}/{_DISPATCHED}",
+                                                              json.dumps({'case_count': len(cases)}), orchestrator_connection.process_name)
+        orchestrator_connection.set_queue_element_status(marker.id, QueueStatus.DONE)
+
+    return len(references)
+
+
+def claim_cases(orchestrator_connection: OrchestratorConnection, count: int = config.CASE_QUEUE_BATCH_SIZE) -> list[tuple[QueueElement, Case]]:
+    """Claim up to the given number of new queue elements and read their cases.
+    The claimed elements are set to 'in progress'.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        count: The max number of elements to claim.
+
+    Returns:
+        A list of the claimed queue elements and their cases. The list is empty if the queue is empty.
+    """
+    claimed = []
+    while len(claimed) < count:
+        element = orchestrator_connection.get_next_queue_element(config.CASE_QUEUE_NAME)
+        if element is None:
+            break
+
+        # A worker can get to the marker of a run before the dispatcher has set it to done
+        if _get_case_number(element) == _DISPATCHED:
+            orchestrator_connection.set_queue_element_status(element.id, QueueStatus.DONE)
+            continue
+
+        claimed.append((element, ksd_process.case_from_dict(json.loads(element.data))))
+    return claimed
+
+
+def complete_case(orchestrator_connection: OrchestratorConnection, element: QueueElement, _case: Case) -> None:
+    """Mark a queue element as done and store the enriched fields of its case in the message.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        element: The queue element of the case.
+        _case: The enriched case.
+    """
+    orchestrator_connection.set_queue_element_status(element.id, QueueStatus.DONE, _encode_result(_case))
+
+
+def release_case(orchestrator_connection: OrchestratorConnection, element: QueueElement) -> None:
+    """Set a claimed queue element back to new, so another worker can take the case.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        element: The queue element of the case.
+    """
+    orchestrator_connection.set_queue_element_status(element.id, QueueStatus.NEW)
+
+
+def fail_case(orchestrator_connection: OrchestratorConnection, element: QueueElement, message: str) -> None:
+    """Mark a queue element as failed.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        element: The queue element of the case.
+        message: A description of the error.
+    """
+    orchestrator_connection.set_queue_element_status(element.id, QueueStatus.FAILED, message[:MAX_MESSAGE_LENGTH])
+
+
+def collect_cases(orchestrator_connection: OrchestratorConnection, run_key: str,
+                  timeout: float = config.CASE_QUEUE_AGGREGATE_TIMEOUT,
+                  poll_interval: float = config.CASE_QUEUE_POLL_INTERVAL) -> tuple[list[Case], dict[str, Exception]]:
+    """Wait until the run has been dispatched and all its queue elements are done or failed, and read the enriched cases.
+    Elements still waiting for a worker when the timeout is reached are returned as errors.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        run_key: The key identifying the run.
+        timeout: The max number of seconds to wait for the dispatcher and the workers.
+        poll_interval: The number of seconds between checks of the queue.
+
+    Raises:
+        TimeoutError: If the run hasn't been dispatched before the timeout.
+
+    Returns:
+        The cases of the run in the order they were published,
+        and a dict of case numbers and the error that stopped each case from being enriched.
+    """
+    deadline = time.time() + timeout
+    while True:
+        elements = _get_run_elements(orchestrator_connection, run_key)
+        marker = elements.pop(_DISPATCHED, None)
+        pending_count = sum(1 for e in elements.values() if e.status in (QueueStatus.NEW, QueueStatus.IN_PROGRESS))
+
+        if marker is not None and pending_count == 0:
+            break
+        if time.time() >= deadline:
+            if marker is None:
+                raise TimeoutError(f"The run {run_key} wasn't dispatched within {timeout} seconds. The dispatcher must run before the aggregator.")
+            break
+
+        if marker is None:
+            orchestrator_connection.log_info(f"Waiting for the dispatcher of the run {run_key}.")
+        else:
+            orchestrator_connection.log_info(f"Waiting for workers on {pending_count} of {len(elements)} cases.")
+        time.sleep(poll_interval)
+
+    case_count = json.loads(marker.data)['case_count']
+    if len(elements) != case_count:
+        orchestrator_connection.log_error(f"The run {run_key} was dispatched with {case_count} cases, but {len(elements)} are in the queue.")
+
+    cases, errors, truncated = _read_cases(list(elements.values()))
+
+    if truncated:
+        metrics.increment("truncated_notes", len(truncated))
+        orchestrator_connection.log_info(f"The absence note was shortened to fit the queue on {len(truncated)} cases: {', '.join(truncated)}")
+
+    return cases, errors
+
+
+def delete_run(orchestrator_connection: OrchestratorConnection, run_key: str) -> int:
+    """Delete all queue elements of the run including the marker,
+    so the personal data of the cases isn't kept in the queue once the reports are sent.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        run_key: The key identifying the run.
+
+    Returns:
+        The number of queue elements deleted.
+    """
+    # Read all pages before deleting, so deleting doesn't shift the offsets
+    elements = _read_run_elements(orchestrator_connection, run_key)
+    for element in elements:
+        orchestrator_connection.delete_queue_element(element.id)
+    return len(elements)
+
+
+def _read_cases(elements: list[QueueElement]) -> tuple[list[Case], dict[str, Exception], list[str]]:
+    """Read the cases of the given queue elements in the order they were published.
+    Returns the cases, a dict of case numbers and the error that stopped each case from being enriched,
+    and the case numbers with a shortened absence note.
+    """
+    cases = []
+    errors: dict[str, Exception] = {}
+    truncated = []
+    for element in sorted(elements, key=lambda e: e.reference):
+        _case = ksd_process.case_from_dict(json.loads(element.data))
+        cases.append(_case)
+
+        if element.status == QueueStatus.DONE:
+            if _decode_result(_case, element.message):
+                truncated.append(_case.case_number)
+        elif element.status == QueueStatus.FAILED:
+            errors[_case.case_number] = WorkerError(element.message)
+        else:
+            errors[_case.case_number] = TimeoutError(f"The case was still '{element.status.value}' when the workers timed out.")
+    return cases, errors, truncated
+
+
+def _get_run_elements(orchestrator_connection: OrchestratorConnection, run_key: str) -> dict[str, QueueElement]:
+    """Get the queue elements of the run created within config.CASE_QUEUE_LOOKBACK by case number.
+    The marker of the run, if any, is included under _DISPATCHED.
+    If a case was published more than once only the newest element is used.
+    """
+    elements: dict[str, QueueElement] = {}
+    # The elements are ordered newest first
+    for element in _read_run_elements(orchestrator_connection, run_key):
+        elements.setdefault(_get_case_number(element), element)
+    return elements
+
+
+def _read_run_elements(orchestrator_connection: OrchestratorConnection, run_key: str) -> list[QueueElement]:
+    """Read all queue elements of the run created within config.CASE_QUEUE_LOOKBACK, newest first."""
+    from_date = datetime.now() - config.CASE_QUEUE_LOOKBACK
+    elements = []
+    offset = 0
+    while True:
+        page = orchestrator_connection.get_queue_elements(config.CASE_QUEUE_NAME, from_date=from_date, offset=offset, limit=_PAGE_SIZE)
+        elements += [e for e in page if e.reference and e.reference.startswith(f"{run_key}/")]
+        if len(page) < _PAGE_SIZE:
+            return elements
+        offset += _PAGE_SIZE
+
+
+def _get_case_number(element: QueueElement) -> str:
+    """Get the case number from the reference of a queue element."""
+    return element.reference.rsplit("/", 1)[-1]
+
+
+def _encode_result(_case: Case) -> str:
+    """Encode the enriched fields of a case as json that fits in a queue element message.
+    The absence note is shortened if it doesn't fit, and the message is flagged so the aggregator can tell.
+    """
+    values = {field: getattr(_case, field, None) for field in ENRICHED_FIELDS}
+    for field in case_cache.DATE_FIELDS:
+        if values[field]:
+            values[field] = values[field].isoformat()
+
+    note = values["absence_reason_note"]
+    message = json.dumps(values, ensure_ascii=False)
+    if len(message) > MAX_MESSAGE_LENGTH and note:
+        values[_NOTE_TRUNCATED] = True
+    while len(message) > MAX_MESSAGE_LENGTH and note:
+        # Escaped characters take up more room in json than in the note, so cut in rounds
+        # instead of cutting the whole excess from the note at once
+        excess = len(message) - MAX_MESSAGE_LENGTH
+        note = note[:-(excess // 2 + 1)]
+        values["absence_reason_note"] = note + "…"
+        message = json.dumps(values, ensure_ascii=False)
+    return message
+
+
+def _decode_result(_case: Case, message: str) -> bool:
+    """Set the enriched fields on a case from a message created by _encode_result.
+    Returns whether the absence note was shortened.
+    """
+    values = json.loads(message)
+    enriched_case = ksd_process.case_from_dict(values)
+    for field in ENRICHED_FIELDS:
+        setattr(_case, field, getattr(enriched_case, field))
+    return values.get(_NOTE_TRUNCATED, False)
@@ -0,0 +1,101 @@
+"""This module handles retrying single cases and stopping early when KSDP is down,
+so a bad case costs a few seconds instead of a rerun of the whole process.
+"""
+
+import threading
+import time
+from collections.abc import Callable
+from typing import TypeVar
+
+from robot_framework import config, metrics
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of trying a case when too many cases in a row have failed."""
+
+
+class CircuitBreaker:
+    """Counts cases failing in a row across all workers and opens when the threshold is reached.
+    Once open it stays open for the rest of the run.
+    """
+
+    def __init__(self, threshold: int = config.CIRCUIT_BREAKER_THRESHOLD):
+        """
+        Args:
+            threshold: The number of cases failing in a row that opens the circuit.
+        """
+        self.threshold = threshold
+        self.is_open = False
+        self._failures_in_row = 0
+        self._lock = threading.Lock()
+
+    def record_success(self) -> None:
+        """Record a case that succeeded."""
+        with self._lock:
+            self._failures_in_row = 0
+
+    def record_failure(self) -> None:
+        """Record a case that failed all its attempts."""
+        with self._lock:
+            self._failures_in_row += 1
+            if self._failures_in_row >= self.threshold and not self.is_open:
+                self.is_open = True
+                metrics.increment("circuit_breaker_opened")
+
+    def check(self) -> None:
+        """Raise an error if the circuit is open.
+
+        Raises:
+            CircuitOpenError: If the circuit is open.
+        """
+        if self.is_open:
+            raise CircuitOpenError(f"Stopped after {self.threshold} cases in a row failed.")
+
+
+def call_with_retries(function: Callable[[], T], breaker: CircuitBreaker, recover: Callable[[int], None] | None = None,
+                      retry_count: int = config.CASE_RETRY_COUNT, backoff: float = config.CASE_RETRY_BACKOFF) -> T:
+    """Call a function handling a single case and retry it with exponential backoff if it fails.
+    The circuit breaker is told about the result of the case when all attempts are done.
+
+    Args:
+        function: The function to call.
+        breaker: The circuit breaker shared by all cases of the run.
+        recover: A function called with the attempt number before each retry, to get back to a known state.
+                 If it fails the case fails with the error of its last attempt, with the recovery error as the cause.
+        retry_count: The max number of retries.
+        backoff: The seconds to wait before the first retry. The wait doubles on each retry.
+
+    Raises:
+        CircuitOpenError: If the circuit is open before an attempt.
+
+    Returns:
+        The return value of the function.
+    """
+    attempt = 0
+    while True:
+        breaker.check()
+        try:
+            result = function()
+        # Any error gets another try. The last one is raised to the caller.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            if attempt == retry_count:
+                breaker.record_failure()
+                raise
+
+            metrics.increment("case_retries")
+            time.sleep(backoff * 2 ** attempt)
+            if recover:
+                try:
+                    recover(attempt)
+                except Exception as recover_error:
+                    breaker.record_failure()
+                    # The case failed with its own error, so keep that and attach the recovery error to it
+                    raise error from recover_error
+            attempt += 1
+            continue
+
+        breaker.record_success()
+        return result
@@ -0,0 +1,122 @@
+"""This module handles a journal of finished steps in a run, so a retry
+can resume from the first unfinished step instead of starting over.
+"""
+
+import json
+import os
+import shutil
+import threading
+
+from robot_framework import config
+from robot_framework.sub_process import ksd_process, case_cache
+from robot_framework.sub_process.ksd_process import Case
+
+
+class CheckpointJournal:
+    """A journal of the progress of a single run stored on disk.
+    The journal belongs to a run key, e.g. the report period, and is
+    discarded when a journal for a different run key is opened.
+    """
+
+    def __init__(self, run_key: str, folder: str | None = None):
+        self.folder = folder or config.CHECKPOINT_FOLDER
+        self._lock = threading.Lock()
+
+        state = self._read_json("state.json")
+        if not state or state.get('run_key') != run_key:
+            self.clear()
+            os.makedirs(self.folder)
+            state = {'run_key': run_key, 'steps': []}
+
+        self._state = state
+        self._write_json("state.json", self._state)
+
+    def is_done(self, step: str) -> bool:
+        """Check if the given step is finished."""
+        return step in self._state['steps']
+
+    def mark_done(self, step: str) -> None:
+        """Mark the given step as finished."""
+        if not self.is_done(step):
+            self._state['steps'].append(step)
+            self._write_json("state.json", self._state)
+
+    def save_cases(self, cases: list[Case]) -> None:
+        """Save the given cases in the journal, overwriting any saved earlier."""
+        self._write_json("cases.json", [ksd_process.case_to_dict(c) for c in cases])
+
+    def load_cases(self) -> list[Case] | None:
+        """Load the cases saved in the journal or None if none are saved."""
+        cases = self._read_json("cases.json")
+        if cases is None:
+            return None
+        return [ksd_process.case_from_dict(c) for c in cases]
+
+    def append_enriched_case(self, _case: Case) -> None:
+        """Add the info of a case enriched from KSDP to the journal.
+        Only the case number and the fields from KSDP are stored.
+        This is safe to call from multiple threads.
+        """
+        line = json.dumps({'case_number': _case.case_number, 'fields': case_cache.get_fields(_case)}, ensure_ascii=False)
+        with self._lock, open(os.path.join(self.folder, "enriched.jsonl"), "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+            file.flush()
+
+    def apply_enriched_cases(self, cases: list[Case]) -> list[Case]:
+        """Fill out the cases already enriched in the journal.
+
+        Args:
+            cases: The cases of the run.
+
+        Returns:
+            The cases not yet enriched.
+        """
+        enriched = {}
+        try:
+            with open(os.path.join(self.folder, "enriched.jsonl"), encoding="utf-8") as file:
+                for line in file:
+                    # A crash can leave the last line half written
+                    try:
+                        values = json.loads(line)
+                        enriched[values['case_number']] = values['fields']
+                    except (ValueError, KeyError):
+                        continue
+        except FileNotFoundError:
+            pass
+
+        remaining = []
+        for _case in cases:
+            values = enriched.get(_case.case_number)
+            if values:
+                case_cache.set_fields(_case, values)
+            else:
+                remaining.append(_case)
+
+        return remaining
+
+    def clear(self) -> None:
+        """Delete the journal from disk."""
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def _read_json(self, file_name: str):
+        try:
+            with open(os.path.join(self.folder, file_name), encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, file_name: str, value) -> None:
+        path = os.path.join(self.folder, file_name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            json.dump(value, file, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+
+def delete_journal(folder: str | None = None) -> None:
+    """Delete the journal of any run from disk.
+    Used when a run has failed for good, so the cases in the journal aren't kept on disk.
+
+    Args:
+        folder: The folder of the journal. Defaults to config.CHECKPOINT_FOLDER.
+    """
+    shutil.rmtree(folder or config.CHECKPOINT_FOLDER, ignore_errors=True)
@@ -0,0 +1,93 @@
+"""This module handles looking up company info on cases in the CVR register."""
+
+import os
+import threading
+
+from itk_dev_shared_components.misc import cvr_lookup
+
+from robot_framework import config
+from robot_framework.sub_process import file_cache
+from robot_framework.sub_process.ksd_process import Case
+
+
+class CompanyTypeLookup:
+    """Looks up company types one case at a time backed by the CVR cache.
+    It's safe to use from multiple threads, and each CVR number is only looked up once
+    even if several threads ask for it at the same time.
+    """
+
+    def __init__(self, username: str, password: str):
+        """
+        Args:
+            username: The username for the CVR webservice.
+            password: The password for the CVR webservice.
+        """
+        self._credentials = (username, password)
+        self._cache_path = os.path.join(config.CACHE_FOLDER, config.CVR_CACHE_FILE)
+        self._cache = file_cache.load_cache(self._cache_path, config.CVR_CACHE_TTL)
+        self._lock = threading.Lock()
+        self._pending: dict[str, threading.Event] = {}
+        self.hits: set[str] = set()
+        self.lookups: set[str] = set()
+
+    def set_company_type(self, _case: Case) -> None:
+        """Set the company type on a case. Cases without a valid CVR number get no company type.
+
+        Raises:
+            RuntimeError: If the CVR number was being looked up by another thread and that lookup failed.
+        """
+        _case.company_type = self.get_company_type(_case.cvr_number)
+
+    def get_company_type(self, cvr_number: str) -> str | None:
+        """Get the company type of a CVR number from the cache or the CVR register.
+
+        Args:
+            cvr_number: The CVR number to look up.
+
+        Raises:
+            RuntimeError: If the CVR number was being looked up by another thread and that lookup failed.
+
+        Returns:
+            The company type or None if the CVR number isn't valid.
+        """
+        if not is_valid_cvr(cvr_number):
+            return None
+
+        with self._lock:
+            if cvr_number in self._cache:
+                if cvr_number not in self.lookups:
+                    self.hits.add(cvr_number)
+                return self._cache[cvr_number]['value']
+
+            event = self._pending.get(cvr_number)
+            is_owner = event is None
+            if is_owner:
+                event = self._pending[cvr_number] = threading.Event()
+
+        if not is_owner:
+            event.wait()
+            with self._lock:
+                if cvr_number not in self._cache:
+                    raise RuntimeError(f"The lookup of CVR number {cvr_number} failed.")
+                return self._cache[cvr_number]['value']
+
+        try:
+            company_type = cvr_lookup.cvr_lookup(cvr_number, *self._credentials).company_type
+            with self._lock:
+                self._cache[cvr_number] = file_cache.create_entry(company_type)
+                self.lookups.add(cvr_number)
+            return company_type
+        finally:
+            with self._lock:
+                del self._pending[cvr_number]
+            event.set()
+
+    def save(self) -> None:
+        """Save the cache with the new lookups to disk."""
+        with self._lock:
+            file_cache.save_cache(self._cache_path, self._cache)
+
+
+def is_valid_cvr(cvr_number: str) -> bool:
+    """Check if the given string is a valid CVR number of 8 digits."""
+    return bool(cvr_number) and len(cvr_number) == 8 and cvr_number.isdigit()
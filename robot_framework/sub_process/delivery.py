@@ -0,0 +1,126 @@
+"""This module handles delivering the finished reports by email."""
+
+import math
+import mimetypes
+import os
+import smtplib
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from email.message import EmailMessage
+
+from robot_framework import config, metrics
+from robot_framework.sub_process import excel_process
+from robot_framework.sub_process.ksd_process import Case
+
+
+@dataclass
+class Email:
+    """A dataclass representing an email to send with files attached from disk."""
+    receivers: list[str]
+    subject: str
+    body: str
+    attachments: list[tuple[str, str]] = field(default_factory=list)  # (file name, file path)
+
+
+def write_report_parts(cases: list[Case], columns: list[str] | None = None, failed_cases: list[tuple[str, str]] | None = None) -> list[str]:
+    """Write the cases to one or more Excel files in the temp folder.
+    If the workbook is larger than config.MAX_ATTACHMENT_BYTES the cases are split
+    into as many parts as needed to keep each file under the limit.
+    The caller is responsible for deleting the files.
+
+    Args:
+        cases: The cases to write.
+        columns: The columns to include. Defaults to all of them.
+        failed_cases: Case numbers and errors of cases that couldn't be enriched, listed on their own sheet in each part.
+
+    Returns:
+        The paths of the Excel files in order.
+    """
+    path = excel_process.write_excel_file(cases, columns, failed_cases)
+    size = os.path.getsize(path)
+    if size <= config.MAX_ATTACHMENT_BYTES or len(cases) <= 1:
+        return [path]
+
+    os.remove(path)
+
+    # Split on row count with a bit of headroom and split again if a part is still too large
+    part_count = math.ceil(size * 1.1 / config.MAX_ATTACHMENT_BYTES)
+    part_size = math.ceil(len(cases) / part_count)
+    paths = []
+    for i in range(0, len(cases), part_size):
+        paths += write_report_parts(cases[i:i + part_size], columns, failed_cases)
+
+    return paths
+
+
+def create_report_emails(receivers: list[str], subject: str, body: str, file_name: str, paths: list[str]) -> list[Email]:
+    """Create the emails delivering a report.
+    A report in a single file is sent as one email. A report split into parts
+    is sent as one email per part with the part number in the subject and file name.
+
+    Args:
+        receivers: The receivers of the report.
+        subject: The subject of the email.
+        body: The body of the email.
+        file_name: The file name of the report without extension.
+        paths: The paths of the report parts.
+
+    Returns:
+        The emails to send.
+    """
+    if len(paths) == 1:
+        return [Email(receivers, subject, body, [(f"{file_name}.xlsx", paths[0])])]
+
+    emails = []
+    for i, path in enumerate(paths, start=1):
+        part = f"del {i} af {len(paths)}"
+        emails.append(Email(receivers, f"{subject} ({part})", body, [(f"{file_name} {part}.xlsx", path)]))
+    return emails
+
+
+def get_email_key(email: Email) -> str:
+    """Get a key identifying an email across attempts of a run.
+    The subject is left out, since it changes if a retry enriches cases that failed before.
+    """
+    return "|".join(sorted(email.receivers) + [file_name for file_name, _ in email.attachments])
+
+
+def send_emails(emails: list[Email], on_sent: Callable[[Email], None] | None = None) -> None:
+    """Send all the given emails over a single SMTP connection.
+    The time spent is recorded in the metrics as send_email.
+
+    Args:
+        emails: The emails to send.
+        on_sent: A function called with each email right after it's sent, e.g. to add it to a journal.
+    """
+    if not emails:
+        return
+
+    with metrics.span("send_email"), smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as smtp:
+        smtp.ehlo()
+        if config.SMTP_REQUIRE_TLS or smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+
+        for email in emails:
+            smtp.send_message(_create_message(email))
+            metrics.increment("emails_sent")
+            if on_sent:
+                on_sent(email)
+
+
+def _create_message(email: Email) -> EmailMessage:
+    """Build the message of an email and read the attachments from disk."""
+    msg = EmailMessage()
+    msg['to'] = email.receivers
+    msg['from'] = config.REPORT_SENDER
+    msg['subject'] = email.subject
+    msg.set_content(email.body)
+
+    for file_name, path in email.attachments:
+        mime = mimetypes.guess_type(file_name)[0]
+        main, sub = mime.split("/") if mime else ("application", "octet-stream")
+        with open(path, "rb") as file:
+            msg.add_attachment(file.read(), maintype=main, subtype=sub, filename=file_name)
+
+    return msg
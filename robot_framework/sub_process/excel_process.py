@@ -1,64 +1,134 @@
 """This moduel handles Excel files."""
 
-from io import BytesIO
-
-from openpyxl import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
+import os
+import tempfile
+from collections.abc import Iterable
+from typing import BinaryIO
 
 from robot_framework.sub_process.ksd_process import Case
 
+HEADER = [
+    "Oprettelsesdato",
+    "Sagsnummer",
+    "CPR-Nummer",
+    "Navn",
+    "CVR-Nummer",
+    "Virksomhed",
+    "Virksomhedsform",
+    "Første fraværsdag",
+    "Sidste fraværsdag",
+    "Delvis genoptaget arbejde dato",
+    "Delvist uarbejdsdygtig dato",
+    "Delvist uarbejdsdygtig",
+    "Fraværsårsag",
+    "Fraværsårsag bemærkning",
+    "Telefonnummer"
+]
+
+# The case field shown in each column of HEADER
+FIELDS = dict(zip(HEADER, (
+    "creation_date",
+    "case_number",
+    "cpr_number",
+    "name",
+    "cvr_number",
+    "company_name",
+    "company_type",
+    "first_absence_date",
+    "last_absence_date",
+    "partial_work_resumption_date",
+    "partial_incapacity_date",
+    "partial_incapacity_status",
+    "absence_reason",
+    "absence_reason_note",
+    "phone_number"
+)))
+
+# The indices of the columns in HEADER containing dates
+DATE_COLUMNS = (0, 7, 8, 9, 10)
+DATE_FORMAT = "yyyy-mm-dd"
+FAILED_SHEET_TITLE = "Fejlede sager"
+FAILED_HEADER = ["Sagsnummer", "Fejl"]
+DATE_COLUMN_WIDTH = 12
+
+
+def write_excel_file(case_list: Iterable[Case], columns: list[str] | None = None, failed_cases: list[tuple[str, str]] | None = None) -> str:
+    """Write the given cases to an Excel file in the temp folder.
+    The caller is responsible for deleting the file.
+
+    Args:
+        case_list: The cases to write.
+        columns: The columns from HEADER to include. Defaults to all of them.
+        failed_cases: Case numbers and errors of cases that couldn't be enriched, listed on a separate sheet.
+
+    Returns:
+        The path to the Excel file.
+    """
+    handle, file_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(handle)
+
+    try:
+        write_excel_stream(case_list, file_path, columns, failed_cases)
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    return file_path
+
 
-def write_excel(case_list: tuple[Case]) -> BytesIO:
-    """Write the given case list to an Excel sheet.
+def write_excel_stream(case_list: Iterable[Case], file: str | BinaryIO, columns: list[str] | None = None,
+                       failed_cases: list[tuple[str, str]] | None = None) -> int:
+    """Write the given cases to an Excel sheet one row at a time.
+    The sheet is written in write-only mode so memory use doesn't grow with the
+    number of cases, and cases can be consumed lazily from an iterator.
 
     Args:
-        case_list: The list of cases to write.
+        case_list: The cases to write.
+        file: The path or binary file object to save the Excel file to.
+        columns: The columns from HEADER to include in that order. Defaults to all of them.
+        failed_cases: Case numbers and errors of cases that couldn't be enriched.
+                      If given they are listed on a separate sheet.
 
     Returns:
-        An Excel file as a BytesIO object.
+        The number of cases written.
     """
-    wb = Workbook()
-    sheet: Worksheet = wb.active
-
-    header = [
-        "Oprettelsesdato",
-        "Sagsnummer",
-        "CPR-Nummer",
-        "Navn",
-        "CVR-Nummer",
-        "Virksomhed",
-        "Virksomhedsform",
-        "Første fraværsdag",
-        "Sidste fraværsdag",
-        "Delvis genoptaget arbejde dato",
-        "Delvist uarbejdsdygtig dato",
-        "Delvist uarbejdsdygtig",
-        "Fraværsårsag",
-        "Fraværsårsag bemærkning",
-        "Telefonnummer"
-    ]
-    sheet.append(header)
+    # openpyxl is slow to import, so it's only loaded when a report is written
+    # pylint: disable=import-outside-toplevel
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet._write_only import WriteOnlyWorksheet
+
+    columns = columns or HEADER
+    field_names = [FIELDS[c] for c in columns]
+    date_columns = [i for i, c in enumerate(columns) if HEADER.index(c) in DATE_COLUMNS]
+
+    wb = Workbook(write_only=True)
+    sheet: WriteOnlyWorksheet = wb.create_sheet()
 
+    for index in date_columns:
+        sheet.column_dimensions[get_column_letter(index + 1)].width = DATE_COLUMN_WIDTH
+
+    sheet.append(columns)
+
+    count = 0
     for _case in case_list:
-        row = [
-            _case.creation_date,
-            _case.case_number,
-            _case.cpr_number,
-            _case.name,
-            _case.cvr_number,
-            _case.company_name,
-            _case.company_type,
-            _case.first_absence_date,
-            _case.last_absence_date,
-            _case.partial_work_resumption_date,
-            _case.partial_incapacity_date,
-            _case.partial_incapacity_status,
-            _case.absence_reason,
-            _case.absence_reason_note,
-            _case.phone_number
-        ]
+        row = [getattr(_case, name) for name in field_names]
+
+        for index in date_columns:
+            if row[index]:
+                cell = WriteOnlyCell(sheet, value=row[index])
+                cell.number_format = DATE_FORMAT
+                row[index] = cell
+
         sheet.append(row)
+        count += 1
+
+    if failed_cases:
+        failed_sheet = wb.create_sheet(FAILED_SHEET_TITLE)
+        failed_sheet.append(FAILED_HEADER)
+        for failed_case in failed_cases:
+            failed_sheet.append(failed_case)
 
-    file = BytesIO()
     wb.save(file)
-    return file
+    return count
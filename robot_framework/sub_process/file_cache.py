@@ -0,0 +1,59 @@
+"""This module handles simple persistent caches stored as json files on disk."""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+
+def load_cache(file_path: str, max_age: timedelta) -> dict[str, dict]:
+    """Load a cache file and evict all entries older than the given max age.
+    If any entries are evicted the file is rewritten without them right away,
+    so expired data isn't left on disk until the cache is saved again.
+    A missing or unreadable cache file is treated as an empty cache.
+
+    Args:
+        file_path: The path to the cache file.
+        max_age: The maximum age of an entry before it's evicted.
+
+    Returns:
+        A dict of cache keys and their entries.
+    """
+    try:
+        with open(file_path, encoding="utf-8") as file:
+            entries = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    oldest = datetime.now() - max_age
+    fresh_entries = {key: entry for key, entry in entries.items() if datetime.fromisoformat(entry['timestamp']) >= oldest}
+    if len(fresh_entries) < len(entries):
+        save_cache(file_path, fresh_entries)
+    return fresh_entries
+
+
+def save_cache(file_path: str, entries: dict[str, dict]) -> None:
+    """Save the cache entries to disk.
+    The file is written to a temporary file first and then moved in place
+    so a crash never leaves a half written cache.
+
+    Args:
+        file_path: The path to the cache file.
+        entries: A dict of cache keys and their entries.
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(entries, file, ensure_ascii=False)
+    os.replace(temp_path, file_path)
+
+
+def create_entry(value) -> dict:
+    """Create a new cache entry with the current timestamp.
+
+    Args:
+        value: The json serializable value to cache.
+
+    Returns:
+        A cache entry.
+    """
+    return {'timestamp': datetime.now().isoformat(), 'value': value}
@@ -0,0 +1,125 @@
+"""This module handles fetching case info directly from the data endpoints behind the KSDP front end.
+It reuses the cookies of a browser logged in to KSDP instead of clicking through the UI.
+"""
+
+import functools
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from selenium import webdriver
+
+from robot_framework import config, metrics
+from robot_framework.sub_process import case_retry
+from robot_framework.sub_process.case_retry import CircuitBreaker
+from robot_framework.sub_process.ksd_process import Case
+
+# The case fields and their keys in the case detail json
+FIELD_KEYS = {
+    "phone_number": "Telefonnummer",
+    "absence_reason": "FravaersAarsag",
+    "absence_reason_note": "FravaersAarsagBem",
+    "partial_incapacity_date": "DelvisUarbejdsdygtigStartdato",
+    "partial_incapacity_status": "DelvisUarbejdsdygtigAndel"
+}
+
+
+def create_session(browser: webdriver.Chrome) -> requests.Session:
+    """Create a requests session authenticated with the cookies of the browser.
+    The session keeps a pool of connections open for concurrent requests.
+
+    Args:
+        browser: A browser logged in to KSDP.
+
+    Returns:
+        An authenticated session.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = browser.execute_script("return navigator.userAgent;")
+    session.headers["Accept"] = "application/json"
+
+    for cookie in browser.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', "/"))
+
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.KSDP_HTTP_MAX_CONCURRENT)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+def get_case_infos(session: requests.Session, cases: Iterable[Case], on_case_done: Callable[[Case], None] | None = None,
+                   breaker: CircuitBreaker | None = None) -> dict[str, Exception]:
+    """Fetch the case info of the given cases concurrently and fill out the case objects.
+    A failing case is retried with backoff and doesn't stop the other cases,
+    but the remaining cases are skipped if the circuit breaker opens.
+
+    Args:
+        session: A session authenticated to KSDP.
+        cases: The cases to enrich. The case objects are enriched in place.
+               Cases are submitted as they are taken from the iterable, so it can be fed by another thread.
+        on_case_done: A function called with each case when it's enriched.
+        breaker: The circuit breaker of the run. A new one is used if none is given.
+
+    Returns:
+        A dict of case numbers and the error that stopped each case from being enriched.
+        The dict is ordered as the given cases.
+    """
+    breaker = breaker or CircuitBreaker()
+
+    def attempt(_case: Case) -> None:
+        try:
+            with metrics.span("get_case_info"):
+                get_case_info(session, _case)
+        except requests.Timeout:
+            metrics.increment("timeouts")
+            raise
+
+    def fetch(_case: Case) -> Exception | None:
+        try:
+            case_retry.call_with_retries(functools.partial(attempt, _case), breaker)
+        # Errors are isolated to the single case and reported back to the caller.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            return error
+
+        if on_case_done:
+            on_case_done(_case)
+        return None
+
+    with ThreadPoolExecutor(max_workers=config.KSDP_HTTP_MAX_CONCURRENT) as executor:
+        futures = [(_case, executor.submit(fetch, _case)) for _case in cases]
+
+    return {_case.case_number: future.result() for _case, future in futures if future.result()}
+
+
+def get_case_info(session: requests.Session, _case: Case) -> None:
+    """Fetch the case info of a single case and fill out the case object.
+
+    Args:
+        session: A session authenticated to KSDP.
+        _case: The case object to enrich.
+    """
+    url = config.KSDP_URL + config.KSDP_CASE_DATA_PATH.format(case_number=_case.case_number)
+    response = session.get(url, timeout=config.KSDP_HTTP_TIMEOUT)
+    response.raise_for_status()
+    case_dict = response.json()
+
+    _case.phone_number = case_dict.get(FIELD_KEYS['phone_number']) or ""
+    _case.absence_reason = case_dict.get(FIELD_KEYS['absence_reason']) or ""
+    _case.absence_reason_note = case_dict.get(FIELD_KEYS['absence_reason_note']) or ""
+    _case.partial_incapacity_date = _parse_date(case_dict.get(FIELD_KEYS['partial_incapacity_date']))
+    _case.partial_incapacity_status = case_dict.get(FIELD_KEYS['partial_incapacity_status']) or ""
+
+
+def _parse_date(date_string: str | None) -> date | None:
+    """Parse a date in either iso format or the KSDP format DDMMYYYY."""
+    if not date_string:
+        return None
+
+    if "-" in date_string:
+        return date.fromisoformat(date_string[:10])
+
+    return datetime.strptime(date_string, "%d%m%Y").date()
@@ -0,0 +1,144 @@
+"""This module handles enriching cases in parallel across a pool of browsers logged in to KSDP."""
+
+import functools
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config, metrics
+from robot_framework.sub_process import ksd_process, ksd_session, case_retry
+from robot_framework.sub_process.case_retry import CircuitBreaker, CircuitOpenError
+from robot_framework.sub_process.ksd_process import Case
+
+
+def get_case_infos(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome, cases: Iterable[Case], *,
+                   on_case_done: Callable[[Case], None] | None = None, worker_count: int = config.KSDP_WORKER_COUNT,
+                   breaker: CircuitBreaker | None = None) -> dict[str, Exception]:
+    """Enrich the given cases using a pool of browsers logged in to KSDP.
+    The given browser is used as the first worker and each extra worker gets its own KSDP session.
+    All workers take cases from the shared iterable until it is exhausted, so it can be fed by another thread.
+    A failing case is retried with backoff, and the browser is recovered between attempts.
+    A failing case or worker doesn't stop the other workers, but all workers stop if the circuit breaker opens.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        browser: A browser logged in to KSDP.
+        cases: The cases to enrich. The case objects are enriched in place.
+        on_case_done: A function called from the worker threads with each case when it's enriched.
+        worker_count: The max number of browsers to use.
+        breaker: The circuit breaker of the run. A new one is used if none is given.
+
+    Returns:
+        A dict of case numbers and the error that stopped each case from being enriched.
+        The dict is ordered as the given cases.
+    """
+    if isinstance(cases, list):
+        worker_count = min(worker_count, len(cases))
+    worker_count = max(1, worker_count)
+
+    work = _WorkSource(iter(cases), breaker or CircuitBreaker())
+
+    threads = [threading.Thread(target=_worker, args=(orchestrator_connection, browser, 0, work, on_case_done))]
+    for worker_number in range(1, worker_count):
+        threads.append(threading.Thread(target=_worker, args=(orchestrator_connection, None, worker_number, work, on_case_done)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Any cases left weren't picked up because all workers stopped
+    while (item := work.next()) is not None:
+        index, _case = item
+        if work.breaker.is_open:
+            work.errors[index] = (_case, CircuitOpenError("The case was skipped after too many cases in a row failed."))
+        else:
+            work.errors[index] = (_case, RuntimeError("No KSDP worker was available to handle the case."))
+
+    return {work.errors[index][0].case_number: work.errors[index][1] for index in sorted(work.errors)}
+
+
+class _WorkSource:
+    """The cases shared between the workers and the errors they report back."""
+
+    def __init__(self, cases: Iterator[Case], breaker: CircuitBreaker):
+        self.breaker = breaker
+        self._cases = enumerate(cases)
+        self._cases_lock = threading.Lock()
+        self._errors_lock = threading.Lock()
+        self.errors: dict[int, tuple[Case, Exception]] = {}
+
+    def next(self) -> tuple[int, Case] | None:
+        """Take the next case and its index or None if there are no more cases."""
+        with self._cases_lock:
+            return next(self._cases, None)
+
+    def add_error(self, index: int, _case: Case, error: Exception) -> None:
+        """Record the error that stopped a case."""
+        with self._errors_lock:
+            self.errors[index] = (_case, error)
+
+
+def _worker(orchestrator_connection: OrchestratorConnection, browser: webdriver.Chrome | None, worker_number: int,
+            work: _WorkSource, on_case_done: Callable[[Case], None] | None):
+    """Take cases from the work source and enrich them until there are no more cases.
+    If no browser is given the worker uses the KSDP session matching its worker number.
+    The session is kept alive afterwards so it can be reused by a retry.
+    A case is retried with backoff. Before the first retry the open tabs are closed and
+    before later retries the page is reloaded. A case that fails all attempts is recorded
+    in the work source. If the browser can't be reset afterwards the worker stops and
+    leaves the remaining cases to the other workers.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        browser: A browser logged in to KSDP or None to use the worker's own session.
+        worker_number: The number of the worker.
+        work: The shared source of cases.
+        on_case_done: A function called with each case when it's enriched.
+    """
+    if browser is None:
+        try:
+            browser = ksd_session.get_browser(orchestrator_connection, worker_number)
+        # A worker that can't log in should just leave its share to the other workers.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            orchestrator_connection.log_error(f"KSDP worker {worker_number} couldn't log in: {repr(error)}")
+            return
+
+    def get_case_info(_case: Case) -> None:
+        try:
+            with metrics.span("get_case_info"):
+                ksd_process.get_case_info(browser, _case)
+        except TimeoutException:
+            metrics.increment("timeouts")
+            raise
+
+    def recover(attempt: int) -> None:
+        if attempt == 0:
+            ksd_process.close_all_tabs(browser)
+        else:
+            ksd_process.reload_page(browser)
+
+    while (item := work.next()) is not None:
+        index, _case = item
+
+        try:
+            case_retry.call_with_retries(functools.partial(get_case_info, _case), work.breaker, recover)
+            if on_case_done:
+                on_case_done(_case)
+        # Errors are isolated to the single case and reported back to the caller.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            work.add_error(index, _case, error)
+            if isinstance(error, CircuitOpenError):
+                break
+
+            try:
+                ksd_process.close_all_tabs(browser)
+            # pylint: disable-next = broad-exception-caught
+            except Exception:
+                orchestrator_connection.log_error(f"KSDP worker {worker_number} stopped after its browser broke.")
+                break
@@ -1,24 +1,88 @@
 """This module handles interactions with KSDP (Kommunernes Sygedagpengesystem)."""
 
 import os
-from csv import DictReader
+import csv
+import io
+import tempfile
 import time
-from dataclasses import dataclass
+from collections.abc import Collection, Iterable, Iterator
+from dataclasses import dataclass, fields
 from datetime import date, datetime
 
 from selenium import webdriver
 from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.select import Select
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import StaleElementReferenceException
 from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
-from itk_dev_shared_components.misc import file_util
 
-from robot_framework import config
-
-
-@dataclass(init=False)
+from robot_framework import config, metrics
+
+
+PHONE_FIELD = "input[id$=--TelefonnummerTF]"
+ABSENCE_REASON_FIELD = "input[id$=--DDBFravaersAarsag-input]"
+ABSENCE_NOTE_FIELD = "textarea[id$=--TFFravaersAarsagBem]"
+PARTIAL_INCAPACITY_DATE_FIELD = "input[id$=--DPDelvisUarbejdsdygtigStartdato-col0-row0-input]"
+PARTIAL_INCAPACITY_STATUS_FIELD = "input[id$=--DPDelvisUarbejdsdygtigAndel-col1-row0-input]"
+
+NAVBAR_PAGE_2 = "a[id$=--navbar-2]"
+
+# The max time in seconds to wait for a page to be ready and how often to check it.
+READINESS_TIMEOUT = 10
+READINESS_POLL_FREQUENCY = 0.1
+
+# Starts watching the html body for the busy cycle started by the next click.
+_WATCH_BUSY_SCRIPT = """
+window.r34BusySeen = false;
+if (window.r34BusyObserver) window.r34BusyObserver.disconnect();
+window.r34BusyObserver = new MutationObserver(() => {
+    if (document.body.getAttribute('aria-busy') === 'true') window.r34BusySeen = true;
+});
+window.r34BusyObserver.observe(document.body, {attributes: true, attributeFilter: ['aria-busy']});
+"""
+
+# Returns the values of the given fields when the watched busy cycle is over and their data is loaded,
+# or null if it isn't. The data is loaded when UI5 has rendered all changes and the models the fields
+# are bound to have no requests pending. The UI5 checks are skipped on pages without UI5.
+_READINESS_SCRIPT = """
+const selectors = arguments[0];
+if (!window.r34BusySeen) return null;
+if (document.body.getAttribute('aria-busy') === 'true') return null;
+const ui5 = window.sap && sap.ui && sap.ui.getCore ? sap.ui.getCore() : null;
+if (ui5 && ui5.getUIDirty()) return null;
+const values = [];
+for (const selector of selectors) {
+    const element = document.querySelector(selector);
+    if (!element) return null;
+    if (ui5) {
+        const control = sap.ui.core.Element.closestTo ? sap.ui.core.Element.closestTo(element) : jQuery(element).control(0);
+        const model = control && control.getModel();
+        if (model && model.hasPendingRequests && model.hasPendingRequests()) return null;
+    }
+    values.push(element.value);
+}
+return values;
+"""
+
+# Returns the id prefixes of the open case tabs, read from their phone fields.
+_CASE_TABS_SCRIPT = """
+const suffix = '--TelefonnummerTF';
+return Array.from(document.querySelectorAll(arguments[0]), element => element.id.slice(0, -suffix.length));
+"""
+
+# Returns the id of the clickable first cell of the search result row with the given case number,
+# or null if the case isn't listed.
+_FIND_ROW_SCRIPT = """
+for (const cell of document.querySelectorAll("[id^='__table0-rows-row'][id$='-col6']")) {
+    if (cell.textContent.trim() === arguments[0]) return cell.id.replace(/-col6$/, '-col0');
+}
+return null;
+"""
+
+
+@dataclass(init=False, slots=True)
 # pylint: disable-next=too-many-instance-attributes
 class Case:
     """A dataclass representing a single case."""
@@ -37,6 +101,41 @@ class Case:
     absence_reason: str
     absence_reason_note: str
     phone_number: str
+    absentee_type: str
+    case_status: str
+
+
+def case_to_dict(_case: Case) -> dict[str, str | None]:
+    """Convert a case to a json serializable dict.
+    Fields that haven't been set are stored as None.
+
+    Args:
+        _case: The case to convert.
+
+    Returns:
+        A dict of field names and values with dates in iso format.
+    """
+    values = {}
+    for field in fields(Case):
+        value = getattr(_case, field.name, None)
+        values[field.name] = value.isoformat() if isinstance(value, date) else value
+    return values
+
+
+def case_from_dict(values: dict[str, str | None]) -> Case:
+    """Create a case from a dict created by case_to_dict.
+
+    Args:
+        values: A dict of field names and values.
+
+    Returns:
+        The case described by the dict.
+    """
+    _case = Case()
+    for field in fields(Case):
+        value = values.get(field.name)
+        setattr(_case, field.name, date.fromisoformat(value) if value and field.type is date else value)
+    return _case
 
 
 def login(orchestrator_connection: OrchestratorConnection) -> webdriver.Chrome:
@@ -48,18 +147,13 @@ def login(orchestrator_connection: OrchestratorConnection) -> webdriver.Chrome:
     Returns:
         A browser logged in to KSDP.
     """
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--incognito")  # Needed to ignore SSO
-    chrome_options.add_argument("--disable-search-engine-choice-screen")
-    browser = webdriver.Chrome(options=chrome_options)
-    browser.implicitly_wait(2)
-    browser.maximize_window()
-    browser.get("https://ksdp.dk/start")
+    browser = create_browser()
+    browser.get(f"{config.KSDP_URL}/start")
 
     # Select city
-    select = Select(browser.find_element(By.ID, "SelectedAuthenticationUrl"))
+    select = Select(_find(browser, By.ID, "SelectedAuthenticationUrl"))
     select.select_by_visible_text("Aarhus Kommune")
-    browser.find_element(By.CSS_SELECTOR, 'input[value=OK]').click()
+    _click(browser, By.CSS_SELECTOR, 'input[value=OK]')
 
     # Login
     # The login screen is a little jumpy so sometimes it needs multiple tries.
@@ -68,24 +162,24 @@ def login(orchestrator_connection: OrchestratorConnection) -> webdriver.Chrome:
     for _ in range(3):
         try:
             WebDriverWait(browser, 10).until(EC.element_to_be_clickable((By.NAME, "loginfmt")))
-            browser.find_element(By.NAME, "loginfmt").send_keys(creds.username)
+            _find(browser, By.NAME, "loginfmt").send_keys(creds.username)
         except StaleElementReferenceException:
             continue
         break
     else:
         raise RuntimeError("Couldn't enter username.")
-    browser.find_element(By.ID, "idSIButton9").click()
+    _click(browser, By.ID, "idSIButton9")
 
     for _ in range(3):
         try:
             WebDriverWait(browser, 10).until(EC.element_to_be_clickable((By.NAME, "passwd")))
-            browser.find_element(By.NAME, "passwd").send_keys(creds.password)
+            _find(browser, By.NAME, "passwd").send_keys(creds.password)
         except StaleElementReferenceException:
             continue
         break
     else:
         raise RuntimeError("Couldn't enter password.")
-    browser.find_element(By.ID, "idSIButton9").click()
+    _click(browser, By.ID, "idSIButton9")
 
     # Wait for site to load
     WebDriverWait(browser, 60).until(EC.element_to_be_clickable((By.ID, "MainShell-logout")))
@@ -93,8 +187,43 @@ def login(orchestrator_connection: OrchestratorConnection) -> webdriver.Chrome:
     return browser
 
 
-def create_report(browser: webdriver.Chrome, year_from: int, week_from: int, year_to: int, week_to: int, file_path: str):
-    """Generate a csv report 34 in KSDP.
+def create_browser() -> webdriver.Chrome:
+    """Start a Chrome browser using the profile selected in config.KSDP_BROWSER_PROFILE.
+    The "lean" profile runs headless, blocks images and other unneeded resources
+    and doesn't wait for subresources when loading a page.
+
+    Returns:
+        The browser.
+    """
+    lean = config.KSDP_BROWSER_PROFILE == "lean"
+
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--incognito")  # Needed to ignore SSO
+    chrome_options.add_argument("--disable-search-engine-choice-screen")
+
+    if lean:
+        for argument in config.KSDP_LEAN_BROWSER_ARGUMENTS:
+            chrome_options.add_argument(argument)
+        if config.KSDP_LEAN_HEADLESS:
+            chrome_options.add_argument("--headless=new")
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        chrome_options.page_load_strategy = "eager"
+
+    browser = webdriver.Chrome(options=chrome_options)
+
+    if lean:
+        browser.execute_cdp_cmd("Network.enable", {})
+        browser.execute_cdp_cmd("Network.setBlockedURLs", {"urls": config.KSDP_LEAN_BLOCKED_URLS})
+    else:
+        browser.maximize_window()
+
+    return browser
+
+
+def download_report(browser: webdriver.Chrome, year_from: int, week_from: int, year_to: int, week_to: int) -> io.StringIO:
+    """Generate a csv report 34 in KSDP and return it as a text stream ready for iter_csv.
+    The browser saves the download in a private temporary folder which is deleted again
+    as soon as the report is read into memory, so no save dialog is needed.
 
     Args:
         browser: A browser logged in to KSDP.
@@ -102,100 +231,181 @@ def create_report(browser: webdriver.Chrome, year_from: int, week_from: int, yea
         week_from: The week of the from date.
         year_to: The year of the to date.
         week_to: The week of the to date.
-        file_path: The path to save the csv report to.
+
+    Returns:
+        The csv report as a text stream.
     """
-    browser.find_element(By.CSS_SELECTOR, "span[title=Funktioner]").click()
-    browser.find_element(By.CSS_SELECTOR, "button[title=Rapporter]").click()
-    browser.find_element(By.CSS_SELECTOR, "span[title='R34 Liste over nyoprettede sager']").click()
+    _click(browser, By.CSS_SELECTOR, "span[title=Funktioner]")
+    _click(browser, By.CSS_SELECTOR, "button[title=Rapporter]")
+    _click(browser, By.CSS_SELECTOR, "span[title='R34 Liste over nyoprettede sager']")
 
     # Set dates
-    browser.find_element(By.CSS_SELECTOR, "span[id$=--weekCB]").click()
+    _click(browser, By.CSS_SELECTOR, "span[id$=--weekCB]")
 
-    from_input = browser.find_element(By.CSS_SELECTOR, "input[id$=--fromDP-inner]")
+    from_input = _find(browser, By.CSS_SELECTOR, "input[id$=--fromDP-inner]")
     from_input.clear()
     from_input.send_keys(f"{year_from}-{week_from}")
 
-    to_input = browser.find_element(By.CSS_SELECTOR, "input[id$=--toDP-inner]")
+    to_input = _find(browser, By.CSS_SELECTOR, "input[id$=--toDP-inner]")
     to_input.clear()
     to_input.send_keys(f"{year_to}-{week_to}")
 
     # Download
-    browser.find_element(By.CSS_SELECTOR, "button[id$=--oReportsHENTCSVSOM]").click()
-    file_util.handle_save_dialog(file_path)
+    with tempfile.TemporaryDirectory() as download_folder:
+        browser.execute_cdp_cmd("Browser.setDownloadBehavior", {"behavior": "allow", "downloadPath": download_folder})
+        _click(browser, By.CSS_SELECTOR, "button[id$=--oReportsHENTCSVSOM]")
+
+        with metrics.span("download_wait"):
+            download_path = _wait_for_download(download_folder)
+
+        with open(download_path, "rb") as file:
+            data = file.read()
 
-    # Wait for download
-    folder = os.path.dirname(file_path)
-    name, ext = os.path.splitext(os.path.basename(file_path))
-    file_util.wait_for_download(folder, name, ext)
+    close_all_tabs(browser)
 
-    _close_all_tabs(browser)
+    return io.StringIO(data.decode("UTF-8-sig"), newline="")
 
 
-def read_csv_file(file_path: str) -> list[Case]:
-    """Read the rapport 34 csv file, filter relevant cases and
-    return them as a list.
+def create_report(browser: webdriver.Chrome, year_from: int, week_from: int, year_to: int, week_to: int, file_path: str):
+    """Generate a csv report 34 in KSDP and save it to a file.
+    The file only appears when it's complete.
+
+    Args:
+        browser: A browser logged in to KSDP.
+        year_from: The year of the from date.
+        week_from: The week of the from date.
+        year_to: The year of the to date.
+        week_to: The week of the to date.
+        file_path: The path to save the csv report to.
+    """
+    report = download_report(browser, year_from, week_from, year_to, week_to)
+
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="UTF-8", newline="") as file:
+        file.write(report.getvalue())
+    os.replace(temp_path, file_path)
+
+
+def iter_csv_file(file_path: str, absentee_types: Collection[str] = ("Selvstændig",),
+                  excluded_statuses: Collection[str] = ("Afsluttet", "Lukket")) -> Iterator[Case]:
+    """Read the rapport 34 csv file and yield the relevant cases one at a time.
+    The file is kept open until the iterator is exhausted.
 
     Args:
         file_path: The path to the csv file.
+        absentee_types: The values of Sygemeldt-Type to include.
+        excluded_statuses: Cases with a Sagsstatus containing any of these are left out.
 
-    Returns:
-        A list of dicts describing each case.
+    Yields:
+        The relevant cases in the file.
     """
-    cases = []
+    with open(file_path, encoding="UTF-8-sig", newline="") as file:
+        yield from iter_csv(file, absentee_types, excluded_statuses)
 
-    with open(file_path, encoding="UTF-8-sig") as file:
-        reader = DictReader(file, delimiter=";")
-        for line in reader:
-            if line['Sygemeldt-Type'] == "Selvstændig" and "Afsluttet" not in line['Sagsstatus'] and "Lukket" not in line['Sagsstatus']:
-                c = Case()
-                c.creation_date = _convert_date(line['Opret-dato'], "%Y-%m-%d")
-                c.case_number = line['Sagsnummer']
-                c.cpr_number = line['CPR-nummer']
-                c.name = line['Borger']
-                c.cvr_number = line['CVR-nummer']
-                c.company_name = line['Virksomhed']
-                c.first_absence_date = _convert_date(line['Første fraværsdag'], "%Y-%m-%d")
-                c.last_absence_date = _convert_date(line['Sidste fraværsdag'], "%Y-%m-%d")
-                c.partial_work_resumption_date = _convert_date(line['Delvis genoptaget arbejde'], "%Y-%m-%d")
-                cases.append(c)
 
-    return cases
+def iter_csv(file: Iterable[str], absentee_types: Collection[str] = ("Selvstændig",),
+             excluded_statuses: Collection[str] = ("Afsluttet", "Lukket")) -> Iterator[Case]:
+    """Read rapport 34 csv lines and yield the relevant cases one at a time.
+    The column positions are resolved from the header once and rows are filtered
+    before any objects are created. Rows with fewer columns than the header are skipped,
+    and the ones that aren't blank are counted in the metrics as skipped_csv_rows.
+
+    Args:
+        file: An iterable of csv lines, e.g. an open text file.
+        absentee_types: The values of Sygemeldt-Type to include.
+        excluded_statuses: Cases with a Sagsstatus containing any of these are left out.
+
+    Yields:
+        The relevant cases in the csv data.
+    """
+    reader = csv.reader(file, delimiter=";")
+    header = next(reader, None)
+    if header is None:
+        return
+
+    column = {name: index for index, name in enumerate(header)}
+    type_col = column['Sygemeldt-Type']
+    status_col = column['Sagsstatus']
+    creation_col = column['Opret-dato']
+    case_number_col = column['Sagsnummer']
+    cpr_col = column['CPR-nummer']
+    name_col = column['Borger']
+    cvr_col = column['CVR-nummer']
+    company_col = column['Virksomhed']
+    first_absence_col = column['Første fraværsdag']
+    last_absence_col = column['Sidste fraværsdag']
+    resumption_col = column['Delvis genoptaget arbejde']
+
+    for row in reader:
+        # Skip blank lines, which csv.reader returns as empty rows, and count rows that are cut off
+        if len(row) < len(header):
+            if row:
+                metrics.increment("skipped_csv_rows")
+            continue
+
+        status = row[status_col]
+        if row[type_col] not in absentee_types or any(s in status for s in excluded_statuses):
+            continue
+
+        c = Case()
+        c.creation_date = _convert_iso_date(row[creation_col])
+        c.case_number = row[case_number_col]
+        c.cpr_number = row[cpr_col]
+        c.name = row[name_col]
+        c.cvr_number = row[cvr_col]
+        c.company_name = row[company_col]
+        c.first_absence_date = _convert_iso_date(row[first_absence_col])
+        c.last_absence_date = _convert_iso_date(row[last_absence_col])
+        c.partial_work_resumption_date = _convert_iso_date(row[resumption_col])
+        c.absentee_type = row[type_col]
+        c.case_status = status
+        yield c
 
 
 def get_case_info(browser: webdriver.Chrome, _case: Case) -> None:
     """Open the given case in KSDP and fill out missing information.
+    All fields are read from the tab opened for the case, identified by the id prefix of its elements.
 
     Args:
         browser: A browser logged in to KSDP.
         _case: The case object to enrich.
     """
-    # Search and open case
-    browser.find_element(By.ID, "__jsview0--TFSearchResultCaseNo").clear()
-    browser.find_element(By.ID, "__jsview0--TFSearchResultCaseNo").send_keys(_case.case_number)
-    browser.find_element(By.ID, "__button0").click()
-    WebDriverWait(browser, 10).until(lambda b: b.find_element(By.ID, "__table0-rows-row0-col6").text == _case.case_number)  # Wait for case number to appear
-    browser.find_element(By.ID, "__table0-rows-row0-col0").click()
-    _wait_for_loading(browser)
+    open_tabs = set(browser.execute_script(_CASE_TABS_SCRIPT, PHONE_FIELD))
+    _open_case(browser, _case.case_number)
+    tab = _wait_for_new_tab(browser, open_tabs)
 
     # Get phone number on first page
-    _case.phone_number = browser.find_element(By.CSS_SELECTOR, "input[id$=--TelefonnummerTF]").get_attribute("value")
+    _case.phone_number = _wait_for_fields(browser, "case_page_1", _in_tab(tab, PHONE_FIELD))[0]
 
     # Change page
-    browser.find_element(By.CSS_SELECTOR, "a[id$=--navbar-2]").click()
-    _wait_for_loading(browser)
+    browser.execute_script(_WATCH_BUSY_SCRIPT)
+    _click(browser, By.CSS_SELECTOR, _in_tab(tab, NAVBAR_PAGE_2))
 
     # Get info
-    _case.absence_reason = browser.find_element(By.CSS_SELECTOR, "input[id$=--DDBFravaersAarsag-input]").get_attribute("value")
-    _case.absence_reason_note = browser.find_element(By.CSS_SELECTOR, "textarea[id$=--TFFravaersAarsagBem]").get_attribute("value")
-
-    delvist_uarbejdsdygtig_dato = browser.find_element(By.CSS_SELECTOR, "input[id$=--DPDelvisUarbejdsdygtigStartdato-col0-row0-input]").get_attribute("value")
+    values = _wait_for_fields(browser, "case_page_2", *(_in_tab(tab, s) for s in (ABSENCE_REASON_FIELD, ABSENCE_NOTE_FIELD,
+                                                                                  PARTIAL_INCAPACITY_DATE_FIELD, PARTIAL_INCAPACITY_STATUS_FIELD)))
+    _case.absence_reason, _case.absence_reason_note, delvist_uarbejdsdygtig_dato, _case.partial_incapacity_status = values
     _case.partial_incapacity_date = _convert_date(delvist_uarbejdsdygtig_dato, "%d%m%Y")
-    _case.partial_incapacity_status = browser.find_element(By.CSS_SELECTOR, "input[id$=--DPDelvisUarbejdsdygtigAndel-col1-row0-input]").get_attribute("value")
 
-    _close_all_tabs(browser)
+    close_case_tab(browser)
+
+
+def close_case_tab(browser: webdriver.Chrome):
+    """Close the tab of the case opened last, leaving the search tab open.
+    If more tabs are open than expected all of them are closed.
+
+    Args:
+        browser: A browser logged in to KSDP.
+    """
+    tab_close_buttons = browser.find_elements(By.CLASS_NAME, "kmdtabclose")
+
+    if len(tab_close_buttons) > 2:
+        close_all_tabs(browser)
+    elif len(tab_close_buttons) == 2:
+        tab_close_buttons[1].click()
 
 
-def _close_all_tabs(browser: webdriver.Chrome):
+def close_all_tabs(browser: webdriver.Chrome):
     """Close all open tabs in KSDP.
     Note the first tab can't be closed.
 
@@ -209,6 +419,84 @@ def _close_all_tabs(browser: webdriver.Chrome):
         tab_close_buttons = browser.find_elements(By.CLASS_NAME, "kmdtabclose")
 
 
+def reload_page(browser: webdriver.Chrome):
+    """Reload KSDP and wait for it to be ready.
+    Used to get a browser in an unknown state back to the start page.
+
+    Args:
+        browser: A browser logged in to KSDP.
+    """
+    browser.refresh()
+    WebDriverWait(browser, 60).until(EC.element_to_be_clickable((By.ID, "MainShell-logout")))
+
+
+def _open_case(browser: webdriver.Chrome, case_number: str) -> None:
+    """Search for a case and open it from the search result table.
+    The row to open is matched on the case number instead of assuming it's the first row.
+    """
+    # The cases are searched one at a time, since the search only takes a single case number.
+    # Listing the cases of a period would need another search form, and the result table only
+    # renders the visible rows, so a listing couldn't be walked from the html anyway.
+    search_field = _find(browser, By.ID, "__jsview0--TFSearchResultCaseNo")
+    search_field.clear()
+    search_field.send_keys(case_number)
+    _click(browser, By.ID, "__button0")
+    row_id = WebDriverWait(browser, READINESS_TIMEOUT, READINESS_POLL_FREQUENCY).until(lambda b: b.execute_script(_FIND_ROW_SCRIPT, case_number))
+
+    browser.execute_script(_WATCH_BUSY_SCRIPT)
+    _click(browser, By.ID, row_id)
+
+
+def _wait_for_new_tab(browser: webdriver.Chrome, open_tabs: set[str]) -> str:
+    """Wait for a case tab to open that isn't one of the given tabs and return its id prefix."""
+    def new_tab(b: webdriver.Chrome) -> str | bool:
+        tabs = [t for t in b.execute_script(_CASE_TABS_SCRIPT, PHONE_FIELD) if t not in open_tabs]
+        return tabs[0] if tabs else False
+
+    return WebDriverWait(browser, READINESS_TIMEOUT, READINESS_POLL_FREQUENCY).until(new_tab)
+
+
+def _in_tab(tab: str, selector: str) -> str:
+    """Limit a css selector to the elements of the case tab with the given id prefix."""
+    return f"{selector}[id^='{tab}--']"
+
+
+def _wait_for_download(folder: str) -> str:
+    """Wait for the browser to finish a download in the given folder.
+    Chrome writes the download to a .crdownload file and only renames it when it's complete,
+    so the download is done when the folder has a file and no .crdownload files.
+
+    Args:
+        folder: The download folder, which should be empty before the download.
+
+    Raises:
+        TimeoutError: If the download doesn't finish within config.KSDP_DOWNLOAD_TIMEOUT.
+
+    Returns:
+        The path of the downloaded file.
+    """
+    deadline = time.monotonic() + config.KSDP_DOWNLOAD_TIMEOUT
+    while time.monotonic() < deadline:
+        file_names = os.listdir(folder)
+        if file_names and not any(name.endswith(".crdownload") for name in file_names):
+            return os.path.join(folder, file_names[0])
+        time.sleep(READINESS_POLL_FREQUENCY)
+
+    raise TimeoutError(f"The report download didn't finish within {config.KSDP_DOWNLOAD_TIMEOUT} seconds.")
+
+
+def _find(browser: webdriver.Chrome, by: str, value: str) -> WebElement:
+    """Find an element, waiting up to READINESS_TIMEOUT for it to appear.
+    Used instead of an implicit wait, so lookups that are expected to find nothing return right away.
+    """
+    return WebDriverWait(browser, READINESS_TIMEOUT, READINESS_POLL_FREQUENCY).until(EC.presence_of_element_located((by, value)))
+
+
+def _click(browser: webdriver.Chrome, by: str, value: str) -> None:
+    """Click an element, waiting up to READINESS_TIMEOUT for it to be clickable."""
+    WebDriverWait(browser, READINESS_TIMEOUT, READINESS_POLL_FREQUENCY).until(EC.element_to_be_clickable((by, value))).click()
+
+
 def _convert_date(date_string: str, date_string_format: str) -> date | None:
     """Convert a date string from a given format if possible."""
     if date_string:
@@ -217,13 +505,31 @@ def _convert_date(date_string: str, date_string_format: str) -> date | None:
     return None
 
 
-def _wait_for_loading(browser: webdriver.Chrome):
-    """Wait for KSDP to load.
-    Detect the loading attribute on the html body.
+def _convert_iso_date(date_string: str) -> date | None:
+    """Convert a date string in the format YYYY-MM-DD if possible.
+    This is a faster version of _convert_date for iso dates.
+    """
+    if date_string:
+        return date.fromisoformat(date_string)
+
+    return None
+
+
+def _wait_for_fields(browser: webdriver.Chrome, name: str, *selectors: str) -> list[str]:
+    """Wait for KSDP to finish loading the given fields and return their values.
+    The busy cycle must have been watched with _WATCH_BUSY_SCRIPT before the click that started it.
+    The fields are ready when the html body has been busy and is no longer, UI5 has rendered all changes,
+    all fields exist and the models they are bound to have no requests pending.
+    The time spent waiting is recorded in the metrics as wait_<name>.
 
     Args:
         browser: A browser logged in to KSDP.
+        name: The name to record the wait time under.
+        *selectors: The css selectors of the fields to wait for.
+
+    Returns:
+        The values of the fields in the same order as the selectors.
     """
-    WebDriverWait(browser, 10).until(lambda b: b.find_element(By.TAG_NAME, "body").get_attribute("aria-busy"))  # Wait for loading
-    WebDriverWait(browser, 10).until(lambda b: b.find_element(By.TAG_NAME, "body").get_attribute("aria-busy") is None)  # Wait for loading to disappear
-    time.sleep(1)  # A little extra wait for the data to load
+    with metrics.span(f"wait_{name}"):
+        return WebDriverWait(browser, READINESS_TIMEOUT, poll_frequency=READINESS_POLL_FREQUENCY).until(
+            lambda b: b.execute_script(_READINESS_SCRIPT, selectors))
@@ -0,0 +1,131 @@
+"""This module manages browsers logged in to KSDP, so they can be reused
+across retries instead of logging in again every time.
+"""
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from OpenOrchestrator.orchestrator_connection.connection import OrchestratorConnection
+
+from robot_framework import config
+from robot_framework.sub_process import ksd_process
+
+# Requests the url with the cookies of the page and calls back with the status code,
+# or 0 if the request failed or was redirected.
+_SESSION_CHECK_SCRIPT = """
+const [url, timeout, done] = arguments;
+const controller = new AbortController();
+setTimeout(() => controller.abort(), timeout);
+fetch(url, {credentials: 'same-origin', redirect: 'manual', cache: 'no-store', signal: controller.signal})
+    .then(response => done(response.status), () => done(0));
+"""
+
+# The logged in browsers by session number
+_sessions: dict[int, webdriver.Chrome] = {}
+
+
+def get_browser(orchestrator_connection: OrchestratorConnection, session_number: int = 0) -> webdriver.Chrome:
+    """Get a browser logged in to KSDP.
+    An existing session is reused if it's still valid, otherwise a new one is logged in.
+    Each session number is a separate browser, so different threads can use separate sessions.
+
+    Args:
+        orchestrator_connection: The connection to Orchestrator.
+        session_number: The number of the session to get.
+
+    Returns:
+        A browser logged in to KSDP.
+    """
+    browser = _sessions.get(session_number)
+    if browser is not None:
+        if is_valid(browser):
+            return browser
+
+        orchestrator_connection.log_trace(f"KSDP session {session_number} expired. Logging in again.")
+        _quit(browser)
+
+    browser = ksd_process.login(orchestrator_connection)
+    _sessions[session_number] = browser
+    return browser
+
+
+def is_valid(browser: webdriver.Chrome) -> bool:
+    """Check if the browser is still alive and logged in to KSDP.
+    The page keeps showing KSDP after the session has expired on the server, so if
+    config.KSDP_SESSION_CHECK_PATH is set it's requested with the browser's cookies as well.
+    The session is only treated as expired if the request is refused with 401 or 403.
+    Any other answer, like a 404 or a redirect, can't tell, so the logout button decides.
+
+    Args:
+        browser: The browser to check.
+
+    Returns:
+        True if the browser is logged in as far as can be told.
+    """
+    try:
+        if not browser.execute_script("return document.getElementById('MainShell-logout') !== null;"):
+            return False
+
+        if config.KSDP_SESSION_CHECK_PATH is None:
+            return True
+
+        status = browser.execute_async_script(_SESSION_CHECK_SCRIPT, f"{config.KSDP_URL}{config.KSDP_SESSION_CHECK_PATH}",
+                                              config.KSDP_SESSION_CHECK_TIMEOUT * 1000)
+        return status not in (401, 403)
+    except WebDriverException:
+        return False
+
+
+def get_screenshot() -> bytes | None:
+    """Take a png screenshot of the first open KSDP session.
+
+    Returns:
+        The screenshot as png bytes or None if no session is open.
+    """
+    for browser in list(_sessions.values()):
+        try:
+            return browser.get_screenshot_as_png()
+        except WebDriverException:
+            continue
+    return None
+
+
+def get_browsers() -> list[webdriver.Chrome]:
+    """Get the browsers of all open KSDP sessions."""
+    return list(_sessions.values())
+
+
+def reset_sessions() -> None:
+    """Close all open tabs in the KSDP sessions, so they are ready for a new attempt.
+    Sessions that can't be reset are closed.
+    """
+    for session_number, browser in list(_sessions.items()):
+        try:
+            ksd_process.close_all_tabs(browser)
+        except WebDriverException:
+            _quit(browser)
+            del _sessions[session_number]
+
+
+def close_all() -> None:
+    """Gracefully close all KSDP sessions."""
+    for browser in _sessions.values():
+        _quit(browser)
+    _sessions.clear()
+
+
+def kill_all() -> None:
+    """Forcefully kill the driver processes of all KSDP sessions."""
+    for browser in _sessions.values():
+        try:
+            browser.service.process.kill()
+        except (AttributeError, OSError):
+            pass
+    _sessions.clear()
+
+
+def _quit(browser: webdriver.Chrome) -> None:
+    """Quit the browser and ignore any errors from a browser that's already dead."""
+    try:
+        browser.quit()
+    except WebDriverException:
+        pass
@@ -0,0 +1,102 @@
+"""This module runs the enrichment of cases as a pipeline of stages connected by bounded queues.
+Each case moves on to KSDP as soon as its company type is known, so the CVR lookups
+and the KSDP enrichment overlap instead of running one after the other.
+"""
+
+import queue
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+from robot_framework import config, metrics
+from robot_framework.sub_process.cvr_process import CompanyTypeLookup
+from robot_framework.sub_process.ksd_process import Case
+
+# Marks the end of the cases in a queue
+_END = None
+
+
+def enrich_cases(cases: list[Case], ksdp_case_numbers: set[str], lookup: CompanyTypeLookup,
+                 get_case_infos: Callable[[Iterable[Case]], dict[str, Exception]]) -> dict[str, Exception]:
+    """Set the company type on all cases and get info from KSDP on the given subset of them.
+    The cases are read into the CVR stage by a background thread and looked up by
+    config.CVR_MAX_CONCURRENT threads. The KSDP stage runs in the calling thread and
+    takes cases as they come out of the CVR stage.
+    A case that fails in the CVR stage is not sent to KSDP.
+
+    Args:
+        cases: The cases to enrich. The case objects are enriched in place.
+        ksdp_case_numbers: The case numbers of the cases to get info on from KSDP.
+        lookup: The company type lookup to use in the CVR stage.
+        get_case_infos: A function enriching the cases from an iterable from KSDP
+                        and returning the errors by case number, e.g. ksd_pool.get_case_infos.
+
+    Returns:
+        A dict of case numbers and the error that stopped each case from being enriched.
+        The dict is ordered as the given case list.
+    """
+    cvr_queue: queue.Queue[Case | None] = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    ksdp_queue: queue.Queue[Case | None] = queue.Queue(maxsize=config.PIPELINE_QUEUE_SIZE)
+    cvr_errors: dict[str, Exception] = {}
+
+    producer = threading.Thread(target=_run_cvr_stage, args=(cases, ksdp_case_numbers, lookup, cvr_queue, ksdp_queue),
+                                kwargs={'cvr_errors': cvr_errors}, daemon=True)
+    producer.start()
+
+    try:
+        ksdp_errors = get_case_infos(_iter_queue(ksdp_queue))
+    finally:
+        # Keep taking cases until the CVR stage is done, so it's never blocked on a full queue
+        for _ in _iter_queue(ksdp_queue):
+            pass
+        producer.join()
+
+    errors = cvr_errors | ksdp_errors
+    return {c.case_number: errors[c.case_number] for c in cases if c.case_number in errors}
+
+
+def _run_cvr_stage(cases: list[Case], ksdp_case_numbers: set[str], lookup: CompanyTypeLookup,
+                   cvr_queue: queue.Queue, ksdp_queue: queue.Queue, *, cvr_errors: dict[str, Exception]) -> None:
+    """Feed the cases through the CVR workers and mark the end of the KSDP queue when they are done."""
+    workers = [threading.Thread(target=_cvr_worker, args=(lookup, cvr_queue, ksdp_queue, ksdp_case_numbers, cvr_errors), daemon=True)
+               for _ in range(config.CVR_MAX_CONCURRENT)]
+    for worker in workers:
+        worker.start()
+
+    for _case in cases:
+        cvr_queue.put(_case)
+    cvr_queue.put(_END)
+
+    for worker in workers:
+        worker.join()
+    ksdp_queue.put(_END)
+
+
+def _cvr_worker(lookup: CompanyTypeLookup, cvr_queue: queue.Queue, ksdp_queue: queue.Queue,
+                ksdp_case_numbers: set[str], cvr_errors: dict[str, Exception]) -> None:
+    """Set the company type on cases from the CVR queue and pass on the ones that need info from KSDP."""
+    while True:
+        _case = cvr_queue.get()
+        if _case is _END:
+            # Leave the end mark for the other workers
+            cvr_queue.put(_END)
+            return
+
+        try:
+            with metrics.span("cvr_lookup_case"):
+                lookup.set_company_type(_case)
+        # Errors are isolated to the single case and reported back to the caller.
+        # pylint: disable-next = broad-exception-caught
+        except Exception as error:
+            cvr_errors[_case.case_number] = error
+            continue
+
+        if _case.case_number in ksdp_case_numbers:
+            ksdp_queue.put(_case)
+
+
+def _iter_queue(q: queue.Queue) -> Iterator[Case]:
+    """Yield cases from the queue until the end mark is reached."""
+    while (_case := q.get()) is not _END:
+        yield _case
+    # Leave the end mark, so the queue can be iterated again
+    q.put(_END)
@@ -0,0 +1,86 @@
+"""This module handles the definitions of the report variants a run produces.
+All variants are cut from the same enriched cases, so one run can serve several teams.
+"""
+
+from dataclasses import dataclass, field
+
+from robot_framework.sub_process import excel_process
+from robot_framework.sub_process.ksd_process import Case
+
+DEFAULT_NAME = "Rapport 34"
+DEFAULT_ABSENTEE_TYPES = ["Selvstændig"]
+DEFAULT_EXCLUDED_STATUSES = ["Afsluttet", "Lukket"]
+
+
+@dataclass
+class ReportDefinition:
+    """A dataclass describing a single report variant."""
+    name: str
+    receivers: list[str]
+    absentee_types: list[str] = field(default_factory=lambda: list(DEFAULT_ABSENTEE_TYPES))
+    excluded_statuses: list[str] = field(default_factory=lambda: list(DEFAULT_EXCLUDED_STATUSES))
+    columns: list[str] = field(default_factory=lambda: list(excel_process.HEADER))
+
+
+def from_dict(values: dict) -> ReportDefinition:
+    """Create a report definition from a json object like:
+    {"name": "Rapport 34", "receivers": ["a@b.dk"], "absentee_types": ["Selvstændig"],
+    "excluded_statuses": ["Afsluttet", "Lukket"], "columns": ["Sagsnummer", "Navn"]}
+    Only name and receivers are required.
+
+    Args:
+        values: The json object as a dict.
+
+    Raises:
+        ValueError: If the definition names a column that doesn't exist.
+
+    Returns:
+        The report definition.
+    """
+    definition = ReportDefinition(name=values["name"], receivers=values["receivers"])
+
+    if "absentee_types" in values:
+        definition.absentee_types = values["absentee_types"]
+    if "excluded_statuses" in values:
+        definition.excluded_statuses = values["excluded_statuses"]
+    if "columns" in values:
+        definition.columns = values["columns"]
+
+    unknown_columns = [c for c in definition.columns if c not in excel_process.HEADER]
+    if unknown_columns:
+        raise ValueError(f"Unknown columns in report '{definition.name}': {unknown_columns}")
+
+    return definition
+
+
+def matches(definition: ReportDefinition, _case: Case) -> bool:
+    """Check if a case belongs in the given report.
+
+    Args:
+        definition: The report definition.
+        _case: The case to check.
+
+    Returns:
+        True if the case has one of the absentee types and none of the excluded statuses.
+    """
+    if _case.absentee_type not in definition.absentee_types:
+        return False
+    return not any(status in _case.case_status for status in definition.excluded_statuses)
+
+
+def get_union_filter(definitions: list[ReportDefinition]) -> tuple[set[str], set[str]]:
+    """Get a filter letting through every case that belongs in at least one of the reports.
+    The filter may let through a few more cases than needed, but never fewer.
+
+    Args:
+        definitions: The report definitions.
+
+    Returns:
+        The absentee types to include and the case statuses to exclude.
+    """
+    absentee_types = set()
+    excluded_statuses = set(definitions[0].excluded_statuses) if definitions else set()
+    for definition in definitions:
+        absentee_types.update(definition.absentee_types)
+        excluded_statuses.intersection_update(definition.excluded_statuses)
+    return absentee_types, excluded_statuses